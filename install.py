@@ -31,7 +31,6 @@ def main() -> None:
     is_windows = platform.system() == "Windows"
 
     bin_dir = "Scripts" if is_windows else "bin"
-    pip = os.path.join(venv_dir, bin_dir, "pip")
     python_exe = os.path.join(venv_dir, bin_dir, "python")
 
     # 2. Create virtual environment
@@ -41,41 +40,49 @@ def main() -> None:
     else:
         print("Virtual environment already exists.")
 
-    # 3. Upgrade pip
-    print("Upgrading pip...")
-    subprocess.check_call([pip, "install", "--upgrade", "pip"])
-
-    # 4. Install project
+    # 3. Upgrade pip and install project in a single pip run
+    # (python -m pip so pip can replace itself on Windows)
+    pip_cmd = [python_exe, "-m", "pip", "install", "--upgrade", "pip"]
     if dev:
-        print("Installing panda-bot in development mode...")
-        subprocess.check_call([pip, "install", "-e", ".[dev]"], cwd=project_dir)
+        print("Upgrading pip and installing panda-bot in development mode...")
+        subprocess.check_call([*pip_cmd, "-e", ".[dev]"], cwd=project_dir)
     else:
-        print("Installing panda-bot...")
-        subprocess.check_call([pip, "install", "."], cwd=project_dir)
+        print("Upgrading pip and installing panda-bot...")
+        subprocess.check_call([*pip_cmd, "."], cwd=project_dir)
 
-    # 5. Install Playwright browsers
+    # 4. Install Playwright browsers in the background; the download dominates
+    # install time and the remaining steps don't depend on it
     print("Installing Playwright Chromium browser...")
-    subprocess.check_call([python_exe, "-m", "playwright", "install", "chromium"])
-
-    # 6. Create data directory
-    data_dir = os.path.join(project_dir, "data")
-    os.makedirs(data_dir, exist_ok=True)
-    gitkeep = os.path.join(data_dir, ".gitkeep")
-    if not os.path.exists(gitkeep):
-        with open(gitkeep, "w") as f:
-            pass
-
-    # 7. Copy config files if missing
-    for src, dst in [("config.example.yaml", "config.yaml"), (".env.example", ".env")]:
-        src_path = os.path.join(project_dir, src)
-        dst_path = os.path.join(project_dir, dst)
-        if not os.path.exists(dst_path) and os.path.exists(src_path):
-            shutil.copy(src_path, dst_path)
-            print(f"Created {dst} from {src}")
-        elif os.path.exists(dst_path):
-            print(f"{dst} already exists, skipping.")
-
-    # 8. Print instructions
+    playwright_cmd = [python_exe, "-m", "playwright", "install", "chromium"]
+    playwright_proc = subprocess.Popen(playwright_cmd)
+    try:
+        # 5. Create data directory
+        data_dir = os.path.join(project_dir, "data")
+        os.makedirs(data_dir, exist_ok=True)
+        gitkeep = os.path.join(data_dir, ".gitkeep")
+        if not os.path.exists(gitkeep):
+            with open(gitkeep, "w") as f:
+                pass
+
+        # 6. Copy config files if missing
+        for src, dst in [("config.example.yaml", "config.yaml"), (".env.example", ".env")]:
+            src_path = os.path.join(project_dir, src)
+            dst_path = os.path.join(project_dir, dst)
+            if not os.path.exists(dst_path) and os.path.exists(src_path):
+                shutil.copy(src_path, dst_path)
+                print(f"Created {dst} from {src}")
+            elif os.path.exists(dst_path):
+                print(f"{dst} already exists, skipping.")
+
+        returncode = playwright_proc.wait()
+    finally:
+        # Don't leave the download running if we were interrupted
+        if playwright_proc.poll() is None:
+            playwright_proc.terminate()
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, playwright_cmd)
+
+    # 7. Print instructions
     if is_windows:
         activate_cmd = r".\.venv\Scripts\activate"
     else:
@@ -4,12 +4,13 @@ from __future__ import annotations
 
 import argparse
 import asyncio
+import os
 import signal
 import sys
 from pathlib import Path
 
 from panda_bot.app import PandaBotApp
-from panda_bot.config import load_config
+from panda_bot.config import AppConfig, load_config
 from panda_bot.log import setup_logging
 
 
@@ -108,10 +109,35 @@ def _model_info(config_path: str, env_path: str) -> None:
     print()
 
 
+# Parsed configs keyed by (config_path, env_path), with the (mtime, size) stamps
+# of both files at load time
+_CONFIG_CACHE: dict[tuple[str, str], tuple[tuple[int, int, int, int], AppConfig]] = {}
+
+
+def _file_stamp(path: str) -> tuple[int, int]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return (0, -1)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _cached_load_config(config_path: str, env_path: str) -> AppConfig:
+    """Load config, reusing the previous result if neither file changed on disk."""
+    key = (config_path, env_path)
+    stamp = (*_file_stamp(config_path), *_file_stamp(env_path))
+    cached = _CONFIG_CACHE.get(key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    config = load_config(config_path, env_path)
+    _CONFIG_CACHE[key] = (stamp, config)
+    return config
+
+
 def _run(config_path: str, env_path: str) -> None:
     """Load config and start the application."""
     try:
-        config = load_config(config_path, env_path)
+        config = _cached_load_config(config_path, env_path)
     except FileNotFoundError as e:
         print(f"Error: {e}", file=sys.stderr)
         print("Run 'python install.py' first or copy config.example.yaml to config.yaml")
@@ -136,35 +162,41 @@ def _run(config_path: str, env_path: str) -> None:
                 # Windows doesn't support add_signal_handler
                 signal.signal(sig, lambda s, f: _signal_handler())
 
+        # The stop waiter outlives restarts; only the restart waiter is per-app
+        stop_task = asyncio.create_task(stop_event.wait())
         cfg = config
-        while True:
-            app = PandaBotApp(cfg)
-            await app.start()
-
-            # Wait for shutdown signal OR restart request
-            restart_task = asyncio.create_task(app.restart_requested.wait())
-            stop_task = asyncio.create_task(stop_event.wait())
-            done, pending = await asyncio.wait(
-                {restart_task, stop_task},
-                return_when=asyncio.FIRST_COMPLETED,
-            )
-            for t in pending:
-                t.cancel()
-
-            await app.stop()
-
-            if stop_event.is_set():
-                # Normal shutdown
-                break
-
-            # Restart: reload config
-            try:
-                cfg = load_config(config_path, env_path)
-                setup_logging(cfg.log_level)
-            except Exception as e:
-                print(f"Config reload error: {e}", file=sys.stderr)
-                # Fall back to previous config
-                cfg = config
+        try:
+            while True:
+                app = PandaBotApp(cfg)
+                await app.start()
+
+                # Wait for shutdown signal OR restart request
+                restart_task = asyncio.create_task(app.restart_requested.wait())
+                await asyncio.wait(
+                    {restart_task, stop_task},
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not restart_task.done():
+                    restart_task.cancel()
+                    await asyncio.gather(restart_task, return_exceptions=True)
+
+                await app.stop()
+
+                if stop_event.is_set():
+                    # Normal shutdown
+                    break
+
+                # Restart: reload config
+                try:
+                    cfg = _cached_load_config(config_path, env_path)
+                    setup_logging(cfg.log_level)
+                except Exception as e:
+                    print(f"Config reload error: {e}", file=sys.stderr)
+                    # Fall back to previous config
+                    cfg = config
+        finally:
+            stop_task.cancel()
+            await asyncio.gather(stop_task, return_exceptions=True)
 
     asyncio.run(_async_main())
 
@@ -3,7 +3,8 @@
 from __future__ import annotations
 
 import asyncio
-import json
+import functools
+import io
 import os
 import platform
 import shutil
@@ -12,13 +13,53 @@ from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 from typing import Any
 
+import orjson
+
 from panda_bot.config import AnthropicConfig, ClaudeCodeConfig
 from panda_bot.log import get_logger
 
 logger = get_logger(__name__)
 
-
-@dataclass
+# StreamReader line limit for Claude Code stream-json output. One event is one
+# line, and assistant/tool events carrying large tool output can exceed the
+# 64 KiB asyncio default.
+_STREAM_LINE_LIMIT = 32 * 1024 * 1024
+
+# Prompt-cache breakpoint for the Anthropic API; the prefix up to a marked
+# block is cached for a few minutes and re-read at a discount
+_EPHEMERAL = {"type": "ephemeral"}
+
+
+def _cached_system(system: str) -> str | list[dict[str, Any]]:
+    """Return *system* as a text block marked as a cache breakpoint."""
+    if not system:
+        return system
+    return [{"type": "text", "text": system, "cache_control": _EPHEMERAL}]
+
+
+def _with_cache_breakpoint(messages: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Return *messages* with a cache breakpoint on the last content block.
+
+    The tool loop resends the same messages plus one more exchange each
+    round, so caching up to the newest block lets the next request reuse
+    the whole prefix. Only the last message and block are copied.
+    """
+    if not messages:
+        return messages
+    last = messages[-1]
+    content = last.get("content")
+    if isinstance(content, str):
+        if not content:
+            return messages
+        blocks = [{"type": "text", "text": content, "cache_control": _EPHEMERAL}]
+    elif isinstance(content, list) and content:
+        blocks = [*content[:-1], {**content[-1], "cache_control": _EPHEMERAL}]
+    else:
+        return messages
+    return [*messages[:-1], {**last, "content": blocks}]
+
+
+@dataclass(slots=True)
 class AIResponse:
     """Unified response from any AI backend."""
 
@@ -26,6 +67,7 @@ class AIResponse:
     input_tokens: int = 0
     output_tokens: int = 0
     raw: Any = None  # Backend-specific raw response
+    error: bool = False  # text is a failure message, not a model reply
 
 
 class AIClient(ABC):
@@ -78,6 +120,7 @@ class AnthropicClient(AIClient):
             timeout=config.timeout,
         )
         self._model: str = ""  # set per-request via chat() model param
+        self._prompt_cache = config.prompt_cache
 
     @property
     def model_name(self) -> str:
@@ -97,18 +140,31 @@ class AnthropicClient(AIClient):
         tools: list[dict[str, Any]] | None = None,
     ) -> AIResponse:
         """Send messages to the Anthropic API. Returns raw Message for tool_runner."""
-        kwargs: dict[str, Any] = {
-            "model": model,
-            "max_tokens": max_tokens,
-            "system": system,
-            "messages": messages,
-            "temperature": temperature,
-        }
-        if tools:
-            kwargs["tools"] = tools
-
         logger.debug("api_request", model=model, message_count=len(messages))
-        response = await self._client.messages.create(**kwargs)
+        system_param: str | list[dict[str, Any]] = system
+        if self._prompt_cache:
+            # Breakpoints after tools + system, and after the newest message
+            system_param = _cached_system(system)
+            messages = _with_cache_breakpoint(messages)
+        # Keyword arguments passed directly; tools is omitted when empty
+        create = self._client.messages.create
+        if tools:
+            response = await create(
+                model=model,
+                max_tokens=max_tokens,
+                system=system_param,
+                messages=messages,
+                temperature=temperature,
+                tools=tools,
+            )
+        else:
+            response = await create(
+                model=model,
+                max_tokens=max_tokens,
+                system=system_param,
+                messages=messages,
+                temperature=temperature,
+            )
         logger.debug(
             "api_response",
             model=model,
@@ -152,8 +208,17 @@ class ClaudeCodeClient(AIClient):
         self._model: str = config.model
         self._timeout = config.timeout
         self._allowed_tools = config.allowed_tools
-        self._api_key: str | None = config.api_key
         self._permission_mode: str = config.permission_mode
+        # (system prompt, formatted <INSTRUCTIONS> block) from the last prompt build
+        self._system_block: tuple[str, str] | None = None
+
+        # Subprocess environment, built once per client.
+        # Resolve API key: explicit config > env var > OAuth (no key)
+        # Claude Code CLI reads ANTHROPIC_API_KEY from env (not --api-key flag)
+        self._subprocess_env = dict(os.environ)
+        if config.api_key:
+            self._subprocess_env["ANTHROPIC_API_KEY"] = config.api_key
+        self._auth = "api_key" if self._subprocess_env.get("ANTHROPIC_API_KEY") else "oauth"
 
     @property
     def model_name(self) -> str:
@@ -162,32 +227,13 @@ class ClaudeCodeClient(AIClient):
     @staticmethod
     def _resolve_cli_path(cli_path: str) -> str:
         """Resolve the claude CLI path, checking common install locations."""
-        # If it's an absolute path, use as-is
-        if os.path.isabs(cli_path) and os.path.exists(cli_path):
-            return cli_path
-
-        # Try shutil.which first (searches PATH)
-        found = shutil.which(cli_path)
-        if found:
-            return found
-
-        # On Windows, check common npm global locations
-        if platform.system() == "Windows":
-            candidates = []
-            appdata = os.environ.get("APPDATA", "")
-            if appdata:
-                candidates.append(os.path.join(appdata, "npm", "claude.cmd"))
-                candidates.append(os.path.join(appdata, "npm", "claude"))
-            # Also check LOCALAPPDATA for newer npm versions
-            localappdata = os.environ.get("LOCALAPPDATA", "")
-            if localappdata:
-                candidates.append(os.path.join(localappdata, "npm", "claude.cmd"))
-            for candidate in candidates:
-                if os.path.exists(candidate):
-                    return candidate
-
-        # Return original path as fallback
-        return cli_path
+        env = os.environ
+        return _find_cli(
+            cli_path,
+            env.get("PATH", ""),
+            env.get("APPDATA", ""),
+            env.get("LOCALAPPDATA", ""),
+        )
 
     @property
     def supports_tool_loop(self) -> bool:
@@ -208,7 +254,9 @@ class ClaudeCodeClient(AIClient):
         prompt = self._build_prompt(system, messages)
 
         # Build command - pipe prompt via stdin to avoid Windows encoding issues
-        cmd = [self._cli_path, "-p", "--output-format", "json"]
+        # stream-json (which requires --verbose in print mode) emits one event per
+        # line, so only the final result event has to be held in memory
+        cmd = [self._cli_path, "-p", "--output-format", "stream-json", "--verbose"]
 
         # Add model selection
         if self._model:
@@ -227,10 +275,6 @@ class ClaudeCodeClient(AIClient):
         if system:
             cmd.extend(["--system-prompt", system])
 
-        # Resolve API key: explicit config > env var > OAuth (no key)
-        # Claude Code CLI reads ANTHROPIC_API_KEY from env (not --api-key flag)
-        api_key = self._api_key or os.environ.get("ANTHROPIC_API_KEY")
-
         logger.info(
             "claude_code_request",
             cli_path=self._cli_path,
@@ -238,33 +282,31 @@ class ClaudeCodeClient(AIClient):
             prompt_length=len(prompt),
             system_length=len(system) if system else 0,
             cmd_length=sum(len(c) for c in cmd),
-            auth="api_key" if api_key else "oauth",
+            auth=self._auth,
         )
 
         try:
-            # Pass API key via environment variable
-            env = dict(os.environ)
-            if api_key:
-                env["ANTHROPIC_API_KEY"] = api_key
-
             process = await asyncio.create_subprocess_exec(
                 *cmd,
                 stdin=asyncio.subprocess.PIPE,
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.PIPE,
-                env=env,
+                env=self._subprocess_env,
+                limit=_STREAM_LINE_LIMIT,
             )
 
             try:
-                stdout, stderr = await asyncio.wait_for(
-                    process.communicate(input=prompt.encode("utf-8")),
+                result, last_line, stderr = await asyncio.wait_for(
+                    self._read_stream(process, prompt.encode("utf-8")),
                     timeout=self._timeout,
                 )
             except asyncio.TimeoutError:
                 process.kill()
                 await process.wait()
                 logger.error("claude_code_timeout", timeout=self._timeout)
-                return AIResponse(text=f"Claude Code timed out after {self._timeout} seconds.")
+                return AIResponse(
+                    text=f"Claude Code timed out after {self._timeout} seconds.", error=True
+                )
             except asyncio.CancelledError:
                 process.kill()
                 try:
@@ -273,10 +315,9 @@ class ClaudeCodeClient(AIClient):
                     pass
                 raise
 
-            stdout_text = stdout.decode("utf-8", errors="replace").strip()
-            stderr_text = stderr.decode("utf-8", errors="replace").strip()
-
             if process.returncode != 0:
+                stdout_text = last_line.decode("utf-8", errors="replace").strip()
+                stderr_text = stderr.decode("utf-8", errors="replace").strip()
                 error_detail = stderr_text or stdout_text or "(no output)"
                 logger.error(
                     "claude_code_error",
@@ -284,15 +325,24 @@ class ClaudeCodeClient(AIClient):
                     stderr=stderr_text,
                     stdout=stdout_text[:500],
                 )
-                return AIResponse(text=f"Claude Code error (exit {process.returncode}): {error_detail}")
+                return AIResponse(
+                    text=f"Claude Code error (exit {process.returncode}): {error_detail}",
+                    error=True,
+                )
 
-            return self._parse_response(stdout_text)
+            if result is None:
+                # No result event; fall back to whatever the CLI printed last
+                return AIResponse(
+                    text=last_line.decode("utf-8", errors="replace").strip(), error=True
+                )
+            return self._parse_response(result)
 
         except FileNotFoundError:
             logger.error("claude_code_not_found", cli_path=self._cli_path)
             return AIResponse(
                 text=f"Claude Code CLI not found at '{self._cli_path}'. "
-                "Install it with: npm install -g @anthropic-ai/claude-code"
+                "Install it with: npm install -g @anthropic-ai/claude-code",
+                error=True,
             )
 
     def _build_prompt(self, system: str, messages: list[dict[str, Any]]) -> str:
@@ -301,10 +351,20 @@ class ClaudeCodeClient(AIClient):
         System prompt is embedded at the start of stdin AND sent via
         --system-prompt flag (belt and suspenders for reliability).
         """
-        parts: list[str] = []
+        # Every part is followed by a blank-line separator; the final one is
+        # dropped on return
+        buf = io.StringIO()
+        write = buf.write
 
         if system:
-            parts.append(f"<INSTRUCTIONS>\n{system}\n</INSTRUCTIONS>")
+            # The system prompt rarely changes between calls; reuse the block
+            cached = self._system_block
+            if cached is None or (cached[0] is not system and cached[0] != system):
+                cached = self._system_block = (
+                    system,
+                    f"<INSTRUCTIONS>\n{system}\n</INSTRUCTIONS>\n\n",
+                )
+            write(cached[1])
 
         for msg in messages:
             role = msg.get("role", "")
@@ -312,46 +372,113 @@ class ClaudeCodeClient(AIClient):
 
             if isinstance(content, str):
                 if role == "user":
-                    parts.append(f"User: {content}")
+                    write("User: ")
+                    write(content)
+                    write("\n\n")
                 elif role == "assistant":
-                    parts.append(f"Assistant: {content}")
+                    write("Assistant: ")
+                    write(content)
+                    write("\n\n")
             elif isinstance(content, list):
                 for block in content:
                     if isinstance(block, dict):
                         if block.get("type") == "text":
-                            parts.append(f"{role.title()}: {block['text']}")
+                            write(role.title())
+                            write(": ")
+                            write(block["text"])
+                            write("\n\n")
                         elif block.get("type") == "tool_result":
-                            parts.append(f"Tool Result: {block.get('content', '')}")
+                            write("Tool Result: ")
+                            write(str(block.get("content", "")))
+                            write("\n\n")
 
-        return "\n\n".join(parts)
+        return buf.getvalue()[:-2]
 
-    def _parse_response(self, output: str) -> AIResponse:
-        """Parse Claude Code CLI JSON output."""
+    @staticmethod
+    async def _read_stream(
+        process: asyncio.subprocess.Process, prompt: bytes
+    ) -> tuple[dict[str, Any] | None, bytes, bytes]:
+        """Send the prompt and read stream-json events until the CLI exits.
+
+        Returns the final "result" event (None if there was none), the last
+        non-empty stdout line and the collected stderr.
+        """
+        # Drain stderr concurrently so the CLI never blocks on a full pipe
+        stderr_task = asyncio.create_task(process.stderr.read())
         try:
-            data = json.loads(output)
-
-            # Claude Code JSON output format: {"result": "...", "cost_usd": ..., ...}
-            if isinstance(data, dict):
-                text = data.get("result", "")
-                # Try to extract token usage if available
-                input_tokens = data.get("input_tokens", 0)
-                output_tokens = data.get("output_tokens", 0)
-                return AIResponse(
-                    text=text,
-                    input_tokens=input_tokens,
-                    output_tokens=output_tokens,
-                    raw=data,
-                )
-            # If it's a list (stream format), concatenate text results
-            elif isinstance(data, list):
-                texts = []
-                for item in data:
-                    if isinstance(item, dict) and item.get("type") == "result":
-                        texts.append(item.get("result", ""))
-                return AIResponse(text="\n".join(texts) if texts else str(data))
-
-        except json.JSONDecodeError:
-            # Plain text output
-            pass
-
-        return AIResponse(text=output)
+            stdin = process.stdin
+            try:
+                stdin.write(prompt)
+                await stdin.drain()
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # CLI exited early; the exit code and stderr say why
+            stdin.close()
+
+            result: dict[str, Any] | None = None
+            last_line = b""
+            async for line in process.stdout:
+                # Keep reading to EOF after the result so the CLI can exit cleanly
+                if result is not None or not line.strip():
+                    continue
+                last_line = line
+                try:
+                    event = orjson.loads(line)
+                except orjson.JSONDecodeError:
+                    continue
+                if isinstance(event, dict) and event.get("type") == "result":
+                    result = event
+
+            await process.wait()
+            return result, last_line, await stderr_task
+        finally:
+            stderr_task.cancel()
+
+    def _parse_response(self, data: dict[str, Any]) -> AIResponse:
+        """Convert the Claude Code CLI result event into an AIResponse."""
+        # Result event format: {"type": "result", "result": "...", "cost_usd": ..., ...}
+        text = data.get("result", "")
+        # Try to extract token usage if available
+        input_tokens = data.get("input_tokens", 0)
+        output_tokens = data.get("output_tokens", 0)
+        return AIResponse(
+            text=text,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            raw=data,
+            error=bool(data.get("is_error")),
+        )
+
+
+@functools.lru_cache(maxsize=8)
+def _find_cli(cli_path: str, path_env: str, appdata: str, localappdata: str) -> str:
+    """Locate the claude CLI. Cached per process; the env values are part of the key."""
+    # If it's an absolute path, use as-is
+    if os.path.isabs(cli_path) and os.path.exists(cli_path):
+        return cli_path
+
+    # Try shutil.which first (searches PATH)
+    found = shutil.which(cli_path, path=path_env or None)
+    if found:
+        return found
+
+    # On Windows, check common npm global locations. One scandir per npm dir
+    # covers every candidate name in it (names compared case-insensitively).
+    if platform.system() == "Windows":
+        candidates = []
+        if appdata:
+            candidates.append((os.path.join(appdata, "npm"), ("claude.cmd", "claude")))
+        # Also check LOCALAPPDATA for newer npm versions
+        if localappdata:
+            candidates.append((os.path.join(localappdata, "npm"), ("claude.cmd",)))
+        for npm_dir, names in candidates:
+            try:
+                with os.scandir(npm_dir) as it:
+                    entries = {entry.name.lower(): entry.path for entry in it}
+            except OSError:
+                continue
+            for name in names:
+                if name in entries:
+                    return entries[name]
+
+    # Return original path as fallback
+    return cli_path
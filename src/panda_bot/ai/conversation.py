@@ -2,25 +2,121 @@
 
 from __future__ import annotations
 
-import base64
+import os
+from binascii import b2a_base64
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import groupby
+from operator import attrgetter
 from typing import TYPE_CHECKING, Any
 
+import orjson
+
 from panda_bot.storage.models import ConversationRecord
 
+try:
+    # Optional SIMD base64 encoder (pip install panda-bot[speedups])
+    # b64encode_as_string returns str directly, skipping the intermediate bytes
+    from pybase64 import b64encode_as_string as _b64encode_str
+
+    # pybase64 releases the GIL on large buffers, so several images can be
+    # encoded in parallel; the stdlib encoder holds it, so threads wouldn't help
+    _PARALLEL_ENCODE = True
+except ImportError:
+    def _b64encode_str(data: bytes) -> str:
+        return b2a_base64(data, newline=False).decode("ascii")
+
+    _PARALLEL_ENCODE = False
+
 if TYPE_CHECKING:
     from panda_bot.messenger.models import Attachment
 
-_TEXT_PREFIXES = ("text/",)
+_record_role = attrgetter("role")
+
+_CHAT_ROLES = frozenset({"user", "assistant"})
+_TOOL_ROLES = frozenset({"tool_use", "tool_result"})
 _TEXT_TYPES = frozenset({
     "application/json", "application/xml", "application/javascript",
     "application/x-yaml", "application/sql", "application/x-sh",
     "application/xhtml+xml", "application/csv",
 })
 
+# Characters a JSON document can start with (values plus leading whitespace)
+_JSON_START = frozenset('{["-0123456789tfn \t\r\n')
+
+# Placeholder text for attachments whose content isn't sent
+_BINARY_FMT = "[File: {name} ({media_type}, {size_kb:.1f} KB) \u2014 binary file, content not shown]"
+
 
+@lru_cache(maxsize=64)
 def _is_text_media_type(media_type: str) -> bool:
     """Return True if the media type represents a human-readable text format."""
-    return media_type.startswith(_TEXT_PREFIXES) or media_type in _TEXT_TYPES
+    return media_type.startswith("text/") or media_type in _TEXT_TYPES
+
+
+def _encoded(att: Attachment) -> str:
+    """Return the base64 encoding of the attachment data, computed once per attachment."""
+    encoded = att._b64_cache
+    if encoded is None:
+        encoded = _b64encode_str(att.data)
+        # Attachment is frozen; the cache slot is excluded from eq/hash
+        object.__setattr__(att, "_b64_cache", encoded)
+    return encoded
+
+
+_encode_pool: ThreadPoolExecutor | None = None
+
+
+def _encode_all(attachments: list[Attachment]) -> None:
+    """Base64-encode the not-yet-encoded images in *attachments* in parallel."""
+    global _encode_pool
+    pending = [
+        att for att in attachments
+        if att._b64_cache is None and att.media_type.startswith("image/")
+    ]
+    if len(pending) < 2:
+        return
+    if _encode_pool is None:
+        _encode_pool = ThreadPoolExecutor(
+            max_workers=os.cpu_count() or 2, thread_name_prefix="b64"
+        )
+    # _encoded fills each attachment's cache for the block-building loop to read
+    for _ in _encode_pool.map(_encoded, pending):
+        pass
+
+
+def _image_block(media_type: str, data_b64: str) -> dict[str, Any]:
+    """Build a base64 image content block."""
+    return {
+        "type": "image",
+        "source": {"type": "base64", "media_type": media_type, "data": data_b64},
+    }
+
+
+def _text_file_block(filename: str, body: str) -> dict[str, Any]:
+    """Build a text content block carrying a file's contents."""
+    return {"type": "text", "text": f"[File: {filename}]\n{body}"}
+
+
+def _tool_input(record: ConversationRecord) -> Any:
+    """Return the parsed tool_use input of *record*, parsing it at most once.
+
+    The tool runner re-sends the same records on every step. Malformed
+    content yields an empty dict.
+    """
+    tool_input = record._tool_input
+    if tool_input is None:
+        content = record.content
+        if not content or content[0] not in _JSON_START:
+            # Empty or obviously not JSON; skip the parser and its exception
+            tool_input = {}
+        else:
+            try:
+                tool_input = orjson.loads(content)
+            except (orjson.JSONDecodeError, TypeError):
+                tool_input = {}
+        record._tool_input = tool_input
+    return tool_input
 
 
 def build_messages(
@@ -33,107 +129,93 @@ def build_messages(
     If *current_attachments* are provided, the last user message is converted to
     a multimodal content list with image blocks appended.
     """
-    messages: list[dict[str, Any]] = []
-    i = 0
-
-    while i < len(history):
-        record = history[i]
-
-        if record.role == "user":
-            messages.append({"role": "user", "content": record.content})
-            i += 1
-
-        elif record.role == "assistant":
-            messages.append({"role": "assistant", "content": record.content})
-            i += 1
-
-        elif record.role == "tool_use":
-            # Collect consecutive tool_use blocks into one assistant message
-            content_blocks: list[dict[str, Any]] = []
-            while i < len(history) and history[i].role == "tool_use":
-                import json
-
-                try:
-                    tool_input = json.loads(history[i].content)
-                except (json.JSONDecodeError, TypeError):
-                    tool_input = {}
-                content_blocks.append(
+    if not any(r.role in _TOOL_ROLES for r in history):
+        # Fast path: plain chat, nothing to group
+        messages: list[dict[str, Any]] = [
+            {"role": r.role, "content": r.content} for r in history if r.role in _CHAT_ROLES
+        ]
+    else:
+        # Each record yields at most one message; fill in place, trim at the end
+        messages = [None] * len(history)  # type: ignore[list-item]
+        w = 0
+        i = 0  # index of the group's first record in history, for fallback ids
+        for role, group in groupby(history, key=_record_role):
+            recs = list(group)
+
+            if role == "user" or role == "assistant":
+                for rec in recs:
+                    messages[w] = {"role": role, "content": rec.content}
+                    w += 1
+
+            elif role == "tool_use":
+                # Consecutive tool_use blocks become one assistant message
+                content_blocks = [
                     {
                         "type": "tool_use",
-                        "id": history[i].tool_call_id or f"tool_{i}",
-                        "name": history[i].tool_name or "unknown",
-                        "input": tool_input,
+                        "id": rec.tool_call_id or f"tool_{j}",
+                        "name": rec.tool_name or "unknown",
+                        "input": _tool_input(rec),
                     }
-                )
-                i += 1
-            messages.append({"role": "assistant", "content": content_blocks})
-
-        elif record.role == "tool_result":
-            # Collect consecutive tool_result blocks into one user message
-            result_blocks: list[dict[str, Any]] = []
-            while i < len(history) and history[i].role == "tool_result":
-                result_blocks.append(
+                    for j, rec in enumerate(recs, i)
+                ]
+                messages[w] = {"role": "assistant", "content": content_blocks}
+                w += 1
+
+            elif role == "tool_result":
+                # Consecutive tool_result blocks become one user message
+                result_blocks = [
                     {
                         "type": "tool_result",
-                        "tool_use_id": history[i].tool_call_id or f"tool_{i}",
-                        "content": history[i].content,
+                        "tool_use_id": rec.tool_call_id or f"tool_{j}",
+                        "content": rec.content,
                     }
-                )
-                i += 1
-            messages.append({"role": "user", "content": result_blocks})
+                    for j, rec in enumerate(recs, i)
+                ]
+                messages[w] = {"role": "user", "content": result_blocks}
+                w += 1
 
-        else:
-            i += 1
+            i += len(recs)
+
+        del messages[w:]
 
     # Append attachment blocks to the last user message
     if current_attachments and messages:
-        for idx in range(len(messages) - 1, -1, -1):
-            msg = messages[idx]
-            if msg.get("role") != "user":
-                continue
-            content = msg["content"]
-            # Convert plain string content to list format
-            if isinstance(content, str):
+        last = len(messages) - 1
+        # Usually the last message is the user's; only scan back when it isn't
+        if messages[last].get("role") == "user":
+            idx = last
+        else:
+            idx = next(
+                (k for k in range(last - 1, -1, -1) if messages[k].get("role") == "user"),
+                -1,
+            )
+        if idx >= 0:
+            content = messages[idx]["content"]
+            # Convert plain string content to list format; list content is
+            # extended in place
+            was_str = isinstance(content, str)
+            if was_str:
                 content = [{"type": "text", "text": content}]
+            if _PARALLEL_ENCODE:
+                _encode_all(current_attachments)
             # Append content blocks based on media type
             for att in current_attachments:
                 if att.media_type.startswith("image/"):
                     # Image: base64 image block
-                    content.append(
-                        {
-                            "type": "image",
-                            "source": {
-                                "type": "base64",
-                                "media_type": att.media_type,
-                                "data": base64.b64encode(att.data).decode(),
-                            },
-                        }
-                    )
+                    content.append(_image_block(att.media_type, _encoded(att)))
                 elif _is_text_media_type(att.media_type):
-                    # Text file: decode and include contents
-                    try:
-                        text_content = att.data.decode("utf-8")
-                    except UnicodeDecodeError:
-                        text_content = att.data.decode("utf-8", errors="replace")
-                    content.append(
-                        {
-                            "type": "text",
-                            "text": f"[File: {att.filename}]\n{text_content}",
-                        }
-                    )
+                    # Text file: decode and include contents (bad bytes become U+FFFD)
+                    text_content = att.data.decode("utf-8", errors="replace")
+                    content.append(_text_file_block(att.filename, text_content))
                 else:
                     # Binary file: include metadata only
-                    size_kb = len(att.data) / 1024
-                    content.append(
-                        {
-                            "type": "text",
-                            "text": (
-                                f"[File: {att.filename} "
-                                f"({att.media_type}, {size_kb:.1f} KB) — binary file, content not shown]"
-                            ),
-                        }
+                    text = _BINARY_FMT.format(
+                        name=att.filename,
+                        media_type=att.media_type,
+                        size_kb=len(att.data) / 1024,
                     )
-            messages[idx]["content"] = content
-            break
+                    content.append({"type": "text", "text": text})
+            if was_str:
+                messages[idx]["content"] = content
 
     return messages
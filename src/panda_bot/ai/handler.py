@@ -3,13 +3,19 @@
 from __future__ import annotations
 
 import asyncio
-import json
+import functools
+import itertools
+import os
 import re
 import shlex
-from typing import Any
+import tempfile
+from typing import Any, Iterator
+
+import orjson
 
 from panda_bot.ai.client import AIClient
 from panda_bot.ai.conversation import build_messages
+from panda_bot.ai.response_cache import ResponseCache
 from panda_bot.ai.tool_runner import run_tool_loop
 from panda_bot.ai.tools.base import Tool
 from panda_bot.ai.tools.registry import ToolRegistry
@@ -24,10 +30,111 @@ from panda_bot.storage.models import ConversationRecord
 logger = get_logger(__name__)
 
 MAX_TOOL_ROUNDS = 10
-TOOL_CALL_PATTERN = re.compile(
-    r"<tool_call>\s*(\{.*?\})\s*</tool_call>",
-    re.DOTALL,
+# Name prefix of the temp files attachments are written to for the CLI backend
+_TMP_PREFIX = "panda_att_"
+# Longest single message sent to the messenger; longer replies are split
+_MAX_CHUNK = 4000
+# Loop results that aren't a model reply and must not be cached
+_NOT_A_REPLY = frozenset({"[Tool execution limit reached]", "[작업이 중단되었습니다]"})
+_TOOL_CALL_OPEN = "<tool_call>"
+_TOOL_CALL_CLOSE = "</tool_call>"
+_BAD_TOOL_CALL = 'tool call must be {"tool": "<name>", "input": {...}} with an object input'
+
+# Phrases marking a prior assistant reply that wrongly refused to use tools,
+# matched in one pass by a single alternation
+_REFUSAL_PHRASES = (
+    "기능이 없", "할 수 없", "할 수가 없", "못 해", "못해",
+    "지원하지 않", "불가능", "불가합니다",
+    "I can't", "I cannot", "I don't have", "I'm not able",
+    "no capability", "not supported",
 )
+_REFUSAL_RE = re.compile("|".join(map(re.escape, _REFUSAL_PHRASES)))
+
+
+# Fixed opening and closing sections of the tool system prompt
+_TOOL_PROMPT_HEADER = "\n".join([
+    "",
+    "=== CRITICAL: CUSTOM TOOL SYSTEM ===",
+    "",
+    "You have access to CUSTOM tools provided by the panda-bot platform.",
+    "These tools give you capabilities like controlling a REAL browser (Playwright),",
+    "scheduling tasks, and managing files.",
+    "",
+    "IMPORTANT RULES:",
+    "1. For web browsing tasks (scraping, form filling, clicking, dynamic pages),",
+    "   you MUST use the 'browser' tool below. It controls a real Playwright browser",
+    "   that can handle JavaScript, dynamic content, and user interactions.",
+    "   Do NOT use WebFetch for dynamic or interactive websites.",
+    "2. For scheduling recurring tasks, you MUST use the 'scheduler' tool below.",
+    "3. To use a tool, output EXACTLY this XML format in your response:",
+    "",
+    "<tool_call>",
+    '{"tool": "tool_name", "input": {"param1": "value1"}}',
+    "</tool_call>",
+    "",
+    "4. After outputting <tool_call> tags, STOP and wait. The system will execute",
+    "   the tool and send you the results. Then you can continue.",
+    "5. You can use multiple <tool_call> blocks in one response.",
+    "6. When you have the final answer, respond with plain text (no <tool_call> tags).",
+    "",
+    "Available custom tools:",
+])
+_TOOL_PROMPT_FOOTER = "\n".join([
+    "",
+    "=== BROWSER SESSION INFO ===",
+    "The browser tool maintains a PERSISTENT SESSION across calls.",
+    "Cookies, localStorage, and sessionStorage are preserved between actions.",
+    "This means you can log in to a website and then access authenticated pages",
+    "in subsequent calls without logging in again.",
+    "If 'url' is omitted, the action operates on the current page.",
+    "Use 'clear_session' to reset all session data when needed.",
+    "",
+    "=== EXAMPLES ===",
+    "",
+    "Example 1: Simple page read",
+    "User: 'Show me the content of https://example.com'",
+    "You should respond with:",
+    '<tool_call>',
+    '{"tool": "browser", "input": {"action": "open", "url": "https://example.com"}}',
+    '</tool_call>',
+    "",
+    "Example 2: Login workflow (session is maintained across calls)",
+    "User: 'Log in to example.com and get my dashboard info'",
+    "Step 1 - open the login page:",
+    '<tool_call>',
+    '{"tool": "browser", "input": {"action": "open", "url": "https://example.com/login"}}',
+    '</tool_call>',
+    "Step 2 - fill username:",
+    '<tool_call>',
+    '{"tool": "browser", "input": {"action": "fill", "selector": "#username", "value": "user"}}',
+    '</tool_call>',
+    "Step 3 - fill password:",
+    '<tool_call>',
+    '{"tool": "browser", "input": {"action": "fill", "selector": "#password", "value": "pass"}}',
+    '</tool_call>',
+    "Step 4 - click login button:",
+    '<tool_call>',
+    '{"tool": "browser", "input": {"action": "click", "selector": "#login-btn"}}',
+    '</tool_call>',
+    "Step 5 - access authenticated page (session cookies are preserved):",
+    '<tool_call>',
+    '{"tool": "browser", "input": {"action": "open", "url": "https://example.com/dashboard"}}',
+    '</tool_call>',
+    "",
+    "Example 3: Scheduling",
+    "User: 'Check my email every 5 minutes'",
+    "You should respond with:",
+    '<tool_call>',
+    '{"tool": "scheduler", "input": {"action": "add_cron", "cron_expr": "*/5 * * * *", "task_prompt": "Check email and summarize new messages"}}',
+    '</tool_call>',
+    "",
+    "User: 'Send me a test alert in 5 minutes'",
+    "You should respond with:",
+    '<tool_call>',
+    '{"tool": "scheduler", "input": {"action": "add_once", "run_at": "2025-01-15T14:35:00", "task_prompt": "Send: test alert!"}}',
+    '</tool_call>',
+    "=== END TOOL SYSTEM ===",
+])
 
 
 def _build_tool_system_prompt(tools: list[Tool]) -> str:
@@ -35,33 +142,7 @@ def _build_tool_system_prompt(tools: list[Tool]) -> str:
     if not tools:
         return ""
 
-    lines = [
-        "",
-        "=== CRITICAL: CUSTOM TOOL SYSTEM ===",
-        "",
-        "You have access to CUSTOM tools provided by the panda-bot platform.",
-        "These tools give you capabilities like controlling a REAL browser (Playwright),",
-        "scheduling tasks, and managing files.",
-        "",
-        "IMPORTANT RULES:",
-        "1. For web browsing tasks (scraping, form filling, clicking, dynamic pages),",
-        "   you MUST use the 'browser' tool below. It controls a real Playwright browser",
-        "   that can handle JavaScript, dynamic content, and user interactions.",
-        "   Do NOT use WebFetch for dynamic or interactive websites.",
-        "2. For scheduling recurring tasks, you MUST use the 'scheduler' tool below.",
-        "3. To use a tool, output EXACTLY this XML format in your response:",
-        "",
-        "<tool_call>",
-        '{"tool": "tool_name", "input": {"param1": "value1"}}',
-        "</tool_call>",
-        "",
-        "4. After outputting <tool_call> tags, STOP and wait. The system will execute",
-        "   the tool and send you the results. Then you can continue.",
-        "5. You can use multiple <tool_call> blocks in one response.",
-        "6. When you have the final answer, respond with plain text (no <tool_call> tags).",
-        "",
-        "Available custom tools:",
-    ]
+    lines = [_TOOL_PROMPT_HEADER]
     for tool in tools:
         schema = tool.input_schema
         props = schema.get("properties", {})
@@ -77,63 +158,7 @@ def _build_tool_system_prompt(tools: list[Tool]) -> str:
         required = schema.get("required", [])
         if required:
             lines.append(f"Required: {', '.join(required)}")
-
-    lines.extend([
-        "",
-        "=== BROWSER SESSION INFO ===",
-        "The browser tool maintains a PERSISTENT SESSION across calls.",
-        "Cookies, localStorage, and sessionStorage are preserved between actions.",
-        "This means you can log in to a website and then access authenticated pages",
-        "in subsequent calls without logging in again.",
-        "If 'url' is omitted, the action operates on the current page.",
-        "Use 'clear_session' to reset all session data when needed.",
-        "",
-        "=== EXAMPLES ===",
-        "",
-        "Example 1: Simple page read",
-        "User: 'Show me the content of https://example.com'",
-        "You should respond with:",
-        '<tool_call>',
-        '{"tool": "browser", "input": {"action": "open", "url": "https://example.com"}}',
-        '</tool_call>',
-        "",
-        "Example 2: Login workflow (session is maintained across calls)",
-        "User: 'Log in to example.com and get my dashboard info'",
-        "Step 1 - open the login page:",
-        '<tool_call>',
-        '{"tool": "browser", "input": {"action": "open", "url": "https://example.com/login"}}',
-        '</tool_call>',
-        "Step 2 - fill username:",
-        '<tool_call>',
-        '{"tool": "browser", "input": {"action": "fill", "selector": "#username", "value": "user"}}',
-        '</tool_call>',
-        "Step 3 - fill password:",
-        '<tool_call>',
-        '{"tool": "browser", "input": {"action": "fill", "selector": "#password", "value": "pass"}}',
-        '</tool_call>',
-        "Step 4 - click login button:",
-        '<tool_call>',
-        '{"tool": "browser", "input": {"action": "click", "selector": "#login-btn"}}',
-        '</tool_call>',
-        "Step 5 - access authenticated page (session cookies are preserved):",
-        '<tool_call>',
-        '{"tool": "browser", "input": {"action": "open", "url": "https://example.com/dashboard"}}',
-        '</tool_call>',
-        "",
-        "Example 3: Scheduling",
-        "User: 'Check my email every 5 minutes'",
-        "You should respond with:",
-        '<tool_call>',
-        '{"tool": "scheduler", "input": {"action": "add_cron", "cron_expr": "*/5 * * * *", "task_prompt": "Check email and summarize new messages"}}',
-        '</tool_call>',
-        "",
-        "User: 'Send me a test alert in 5 minutes'",
-        "You should respond with:",
-        '<tool_call>',
-        '{"tool": "scheduler", "input": {"action": "add_once", "run_at": "2025-01-15T14:35:00", "task_prompt": "Send: test alert!"}}',
-        '</tool_call>',
-        "=== END TOOL SYSTEM ===",
-    ])
+    lines.append(_TOOL_PROMPT_FOOTER)
 
     return "\n".join(lines)
 
@@ -177,6 +202,32 @@ class MessageHandler:
         self._mcp_manager = mcp_manager
         self._restart_callback = restart_callback
         self._running_tasks: dict[str, tuple[asyncio.Task, asyncio.Event]] = {}
+        # The bot's tools, resolved once; the registry is fully populated before
+        # handlers are created and doesn't change afterwards
+        self._tools = tool_registry.get_tools_by_names(bot_config.ai.tools)
+        # Replies to identical requests; only for bots without tools, whose
+        # replies have no side effects
+        self._response_cache: ResponseCache | None = None
+        if bot_config.ai.response_cache_ttl > 0 and not self._tools:
+            self._response_cache = ResponseCache(bot_config.ai.response_cache_ttl)
+        # ((system, tools), full system prompt, tool reminder) for the CLI tool
+        # loop. Held per handler, so a restart drops the old tools with it.
+        self._cli_prompts: tuple[tuple[str, tuple[Tool, ...]], str, str] | None = None
+        # Caps concurrent AI runs for this bot; bursts queue instead of piling up
+        self._semaphore = asyncio.Semaphore(max(1, bot_config.max_concurrent_requests))
+        # Chat commands by lowercased name: bare ones ("/reset") and ones that
+        # take arguments ("/search <query>"); handlers get (message, text)
+        self._commands = {
+            "/reset": self._cmd_reset,
+            "/model": self._cmd_model,
+            "/stop": self._cmd_stop,
+            "/restart": self._cmd_restart,
+            "/mcp": self._cmd_mcp,  # bare /mcp prints usage
+        }
+        self._arg_commands = {
+            "/search": self._cmd_search,
+            "/mcp": self._cmd_mcp,
+        }
 
     async def handle(self, message: IncomingMessage) -> None:
         """Process an incoming message end-to-end."""
@@ -199,90 +250,20 @@ class MessageHandler:
             else:
                 text = "[File]"
 
-        # Handle special commands
-        if text.lower() == "/reset":
-            self._session_manager.reset_session(bot_id, chat_id)
-            await self._adapter.send_message(
-                OutgoingMessage(chat_id=chat_id, text="Session reset. Starting fresh.")
-            )
-            return
-
-        if text.lower() == "/model":
-            backend = self._bot_config.ai.backend
-            model = self._ai_client.model_name
-            tools = ", ".join(self._bot_config.ai.tools) or "(none)"
-            info = (
-                f"Bot: {bot_id}\n"
-                f"Backend: {backend}\n"
-                f"Model: {model}\n"
-                f"Tools: {tools}"
-            )
-            await self._adapter.send_message(
-                OutgoingMessage(chat_id=chat_id, text=info)
-            )
-            return
-
-        if text.lower().startswith("/search "):
-            query = text[8:].strip()
-            results = await self._session_manager.repo.search(query, bot_id=bot_id, limit=5)
-            if results:
-                response_text = "Search results:\n\n" + "\n---\n".join(
-                    f"[{r.role}] {r.content[:200]}" for r in results
-                )
-            else:
-                response_text = "No results found."
-            await self._adapter.send_message(
-                OutgoingMessage(chat_id=chat_id, text=response_text)
-            )
-            return
-
-        if text.lower() == "/stop":
-            task_info = self._running_tasks.get(chat_id)
-            if task_info:
-                task, cancel_event = task_info
-                cancel_event.set()
-                if not task.done():
-                    task.cancel()
-                await self._adapter.send_message(
-                    OutgoingMessage(chat_id=chat_id, text="작업이 중단되었습니다.")
-                )
-            else:
-                await self._adapter.send_message(
-                    OutgoingMessage(chat_id=chat_id, text="진행 중인 작업이 없습니다.")
-                )
-            return
-
-        if text.lower() == "/restart":
-            if self._restart_callback:
-                await self._adapter.send_message(
-                    OutgoingMessage(chat_id=chat_id, text="봇을 재시작합니다...")
-                )
-                self._restart_callback()
-            else:
-                await self._adapter.send_message(
-                    OutgoingMessage(chat_id=chat_id, text="재시작 기능을 사용할 수 없습니다.")
-                )
-            return
-
-        if text.lower().startswith("/mcp"):
-            await self._handle_mcp_command(chat_id, text)
-            return
-
-        # Show typing indicator
-        await self._adapter.send_typing_indicator(chat_id)
+        # Handle special commands: bare commands match the whole text, the
+        # others take arguments after a space
+        if text[:1] == "/":
+            cmd, sep, _ = text.partition(" ")
+            cmd = cmd.lower()
+            command = self._arg_commands.get(cmd) if sep else self._commands.get(cmd)
+            if command is not None:
+                await command(message, text)
+                return
 
         # Get/create session
         session_id = self._session_manager.get_session_id(bot_id, chat_id)
         repo = self._session_manager.repo
 
-        # Update session metadata
-        await repo.upsert_session(
-            bot_id=bot_id,
-            session_id=session_id,
-            chat_id=chat_id,
-            platform=message.platform.value,
-        )
-
         # Save user message (prefix with attachment label if present)
         if attachments and not text.startswith(("[Image]", "[File]", "[Attachment]")):
             has_image = any(a.media_type.startswith("image/") for a in attachments)
@@ -295,14 +276,26 @@ class MessageHandler:
                 save_text = f"[File] {text}"
         else:
             save_text = text
-        await repo.save_turn(
-            ConversationRecord(
+
+        # Show typing indicator, update session metadata and save the user
+        # message; they're independent, so they run concurrently
+        await asyncio.gather(
+            self._adapter.send_typing_indicator(chat_id),
+            repo.upsert_session(
                 bot_id=bot_id,
                 session_id=session_id,
                 chat_id=chat_id,
-                role="user",
-                content=save_text,
-            )
+                platform=message.platform.value,
+            ),
+            repo.save_turn(
+                ConversationRecord(
+                    bot_id=bot_id,
+                    session_id=session_id,
+                    chat_id=chat_id,
+                    role="user",
+                    content=save_text,
+                )
+            ),
         )
 
         # Load conversation history
@@ -314,7 +307,7 @@ class MessageHandler:
         # Process AI and respond (fire-and-forget so /stop can execute immediately)
         cancel_event = asyncio.Event()
         task = asyncio.create_task(
-            self._process_and_respond(
+            self._process_limited(
                 bot_id, chat_id, session_id, messages, ai_config, attachments,
                 cancel_event,
             )
@@ -330,6 +323,78 @@ class MessageHandler:
 
         task.add_done_callback(_on_task_done)
 
+    async def _cmd_reset(self, message: IncomingMessage, text: str) -> None:
+        chat_id = message.chat_id
+        self._session_manager.reset_session(message.bot_id, chat_id)
+        await self._adapter.send_message(
+            OutgoingMessage(chat_id=chat_id, text="Session reset. Starting fresh.")
+        )
+
+    async def _cmd_model(self, message: IncomingMessage, text: str) -> None:
+        backend = self._bot_config.ai.backend
+        model = self._ai_client.model_name
+        tools = ", ".join(self._bot_config.ai.tools) or "(none)"
+        info = (
+            f"Bot: {message.bot_id}\n"
+            f"Backend: {backend}\n"
+            f"Model: {model}\n"
+            f"Tools: {tools}"
+        )
+        await self._adapter.send_message(
+            OutgoingMessage(chat_id=message.chat_id, text=info)
+        )
+
+    async def _cmd_search(self, message: IncomingMessage, text: str) -> None:
+        query = text[8:].strip()
+        results = await self._session_manager.repo.search(
+            query, bot_id=message.bot_id, limit=5
+        )
+        if results:
+            response_text = "Search results:\n\n" + "\n---\n".join(
+                f"[{r.role}] {r.content[:200]}" for r in results
+            )
+        else:
+            response_text = "No results found."
+        await self._adapter.send_message(
+            OutgoingMessage(chat_id=message.chat_id, text=response_text)
+        )
+
+    async def _cmd_stop(self, message: IncomingMessage, text: str) -> None:
+        chat_id = message.chat_id
+        task_info = self._running_tasks.get(chat_id)
+        if task_info:
+            task, cancel_event = task_info
+            cancel_event.set()
+            if not task.done():
+                task.cancel()
+            await self._adapter.send_message(
+                OutgoingMessage(chat_id=chat_id, text="작업이 중단되었습니다.")
+            )
+        else:
+            await self._adapter.send_message(
+                OutgoingMessage(chat_id=chat_id, text="진행 중인 작업이 없습니다.")
+            )
+
+    async def _cmd_restart(self, message: IncomingMessage, text: str) -> None:
+        chat_id = message.chat_id
+        if self._restart_callback:
+            await self._adapter.send_message(
+                OutgoingMessage(chat_id=chat_id, text="봇을 재시작합니다...")
+            )
+            self._restart_callback()
+        else:
+            await self._adapter.send_message(
+                OutgoingMessage(chat_id=chat_id, text="재시작 기능을 사용할 수 없습니다.")
+            )
+
+    async def _cmd_mcp(self, message: IncomingMessage, text: str) -> None:
+        await self._handle_mcp_command(message.chat_id, text)
+
+    async def _process_limited(self, *args: Any) -> None:
+        """Run _process_and_respond once a concurrency slot is free."""
+        async with self._semaphore:
+            await self._process_and_respond(*args)
+
     async def _process_and_respond(
         self,
         bot_id: str,
@@ -349,13 +414,34 @@ class MessageHandler:
             scheduler_tool.set_context(bot_id=bot_id, chat_id=chat_id)
 
         response_text = ""
+        cacheable = False  # set when response_text is a completed model reply
         try:
             if cancel_event and cancel_event.is_set():
                 return
 
-            if self._ai_client.supports_tool_loop:
+            # Keyed before the loops run, as they append to messages
+            cache_key = None
+            cached = None
+            if self._response_cache is not None and not attachments:
+                cache_key = ResponseCache.make_key(ai_config.system_prompt, messages)
+                if cache_key is not None:
+                    cached = self._response_cache.get(cache_key)
+
+            if cached is not None:
+                logger.info("response_cache_hit", bot_id=bot_id, session_id=session_id)
+                repo.save_turn_nowait(
+                    ConversationRecord(
+                        bot_id=bot_id,
+                        session_id=session_id,
+                        chat_id=chat_id,
+                        role="assistant",
+                        content=cached,
+                    )
+                )
+                response_text = cached
+            elif self._ai_client.supports_tool_loop:
                 # Anthropic API: use tool_runner loop
-                tools = self._tool_registry.get_tools_by_names(ai_config.tools)
+                tools = self._tools
                 response_text = await run_tool_loop(
                     ai_client=self._ai_client,
                     tool_registry=self._tool_registry,
@@ -371,22 +457,16 @@ class MessageHandler:
                     chat_id=chat_id,
                     cancel_event=cancel_event,
                 )
+                cacheable = response_text not in _NOT_A_REPLY
             else:
                 # Claude Code CLI: use text-based tool loop with panda-bot tools
                 # CLI doesn't support vision — save attachments as temp files and reference paths
                 att_refs: list[str] = []
                 if attachments:
-                    import tempfile
-                    import os
-
-                    for att in attachments:
-                        ext = att.media_type.split("/")[-1] if "/" in att.media_type else "bin"
-                        tmp = tempfile.NamedTemporaryFile(
-                            suffix=f".{ext}", prefix="panda_att_", delete=False
-                        )
-                        tmp.write(att.data)
-                        tmp.close()
-                        att_refs.append(tmp.name)
+                    # Write in worker threads so large files don't stall the event loop
+                    att_refs = list(await asyncio.gather(
+                        *(asyncio.to_thread(_dump_attachment, att) for att in attachments)
+                    ))
 
                     # Append file paths to last user message so CLI can reference them
                     paths_note = "\n[Attached files saved to: " + ", ".join(att_refs) + "]"
@@ -396,24 +476,24 @@ class MessageHandler:
                             break
 
                 try:
-                    tools = self._tool_registry.get_tools_by_names(ai_config.tools)
-                    response_text = await self._run_claude_code_tool_loop(
+                    tools = self._tools
+                    response_text, cacheable = await self._run_claude_code_tool_loop(
                         messages=messages,
                         system=ai_config.system_prompt,
                         tools=tools,
                         bot_id=bot_id,
                         session_id=session_id,
                         chat_id=chat_id,
-                        cancel_event=cancel_event,
                     )
                 finally:
                     # Clean up temp files even on cancellation
-                    for path in att_refs:
-                        try:
-                            import os
-                            os.unlink(path)
-                        except OSError:
-                            pass
+                    if att_refs:
+                        await asyncio.to_thread(_remove_files, att_refs)
+
+            if cacheable and cache_key is not None and not (
+                cancel_event and cancel_event.is_set()
+            ):
+                self._response_cache.set(cache_key, response_text)
 
         except asyncio.CancelledError:
             return
@@ -423,14 +503,19 @@ class MessageHandler:
 
         # Collect pending images from tools
         pending_images: list[Attachment] = []
-        for tool in self._tool_registry.get_tools_by_names(ai_config.tools):
+        for tool in self._tools:
             pending_images.extend(tool.take_pending_images())
 
         # Send response (split long messages)
-        for chunk in _split_message(response_text, max_length=4000):
+        if len(response_text) <= _MAX_CHUNK:
             await self._adapter.send_message(
-                OutgoingMessage(chat_id=chat_id, text=chunk)
+                OutgoingMessage(chat_id=chat_id, text=response_text)
             )
+        else:
+            for chunk in _split_message(response_text, max_length=_MAX_CHUNK):
+                await self._adapter.send_message(
+                    OutgoingMessage(chat_id=chat_id, text=chunk)
+                )
 
         # Send pending images (e.g. screenshots) to user
         if pending_images:
@@ -446,9 +531,13 @@ class MessageHandler:
             )
             return
 
-        try:
-            parts = shlex.split(text)
-        except ValueError:
+        # shlex is only needed for quoted values (e.g. JSON in -e) or escapes
+        if "'" in text or '"' in text or "\\" in text:
+            try:
+                parts = shlex.split(text)
+            except ValueError:
+                parts = text.split()
+        else:
             parts = text.split()
         sub = parts[1].lower() if len(parts) > 1 else ""
 
@@ -504,8 +593,7 @@ class MessageHandler:
         bot_id: str,
         session_id: str,
         chat_id: str,
-        cancel_event: asyncio.Event | None = None,
-    ) -> str:
+    ) -> tuple[str, bool]:
         """Run a text-based tool loop for Claude Code CLI backend.
 
         Claude Code CLI doesn't natively support panda-bot's tools, so we:
@@ -513,13 +601,24 @@ class MessageHandler:
         2. Ask Claude to output <tool_call> tags when it needs a tool
         3. Parse and execute tool calls
         4. Send results back and repeat until we get a plain text response
+
+        Returns the reply text and whether it is a completed model reply
+        (False for CLI failures and the round limit).
         """
         repo = self._session_manager.repo
 
-        # Build system prompt with tool descriptions
-        tool_prompt = _build_tool_system_prompt(tools) if tools else ""
-        full_system = system + tool_prompt
-        tool_reminder = _build_tool_reminder(tools) if tools else ""
+        # Build system prompt with tool descriptions, once per system prompt and
+        # tool set (both normally fixed for the handler's lifetime)
+        prompt_key = (system, tuple(tools))
+        prompts = self._cli_prompts
+        if prompts is None or prompts[0] != prompt_key:
+            prompts = (
+                prompt_key,
+                system + _build_tool_system_prompt(tools) if tools else system,
+                _build_tool_reminder(tools) if tools else "",
+            )
+            self._cli_prompts = prompts
+        _, full_system, tool_reminder = prompts
         logger.info(
             "claude_code_tool_loop",
             tool_count=len(tools),
@@ -527,151 +626,234 @@ class MessageHandler:
             system_length=len(full_system),
         )
 
-        # Work on a copy to avoid mutating originals
+        # Work on a copy to avoid mutating originals. Only the message dicts
+        # rewritten below are copied; the rest are shared with the caller.
         if tool_reminder and messages:
-            messages = [m.copy() for m in messages]
-
-            # Sanitize prior assistant messages that wrongly refused tool usage
-            refusal_phrases = [
-                "기능이 없", "할 수 없", "할 수가 없", "못 해", "못해",
-                "지원하지 않", "불가능", "불가합니다",
-                "I can't", "I cannot", "I don't have", "I'm not able",
-                "no capability", "not supported",
-            ]
+            messages = messages[:]
+
+            # Sanitize prior assistant messages that wrongly refused tool usage,
+            # noting the last plain-text user message on the same pass
+            last_user_idx = -1
             for i, msg in enumerate(messages):
-                if msg.get("role") == "assistant" and isinstance(msg.get("content"), str):
-                    content = msg["content"]
-                    if any(phrase in content for phrase in refusal_phrases):
-                        messages[i]["content"] = (
+                content = msg.get("content")
+                if not isinstance(content, str):
+                    continue
+                role = msg.get("role")
+                if role == "user":
+                    last_user_idx = i
+                elif role == "assistant" and _REFUSAL_RE.search(content):
+                    messages[i] = {
+                        **msg,
+                        "content": (
                             "[Note: This previous response was incorrect. "
                             "Tools ARE available now. Ignore this response.]"
-                        )
+                        ),
+                    }
 
             # Append tool reminder to the last user message
-            for i in range(len(messages) - 1, -1, -1):
-                if messages[i].get("role") == "user" and isinstance(messages[i].get("content"), str):
-                    messages[i]["content"] += tool_reminder
-                    break
+            if last_user_idx >= 0:
+                msg = messages[last_user_idx]
+                messages[last_user_idx] = {**msg, "content": msg["content"] + tool_reminder}
 
+        # /stop cancels the task; CancelledError surfaces at whichever await is
+        # in progress (the CLI call kills its subprocess before re-raising) and
+        # propagates, so no reply is sent after /stop's own confirmation
         rounds = 0
-        while rounds < MAX_TOOL_ROUNDS:
-            # Check for cancellation at each iteration
-            if cancel_event and cancel_event.is_set():
-                logger.info("tool_loop_cancelled", bot_id=bot_id, round=rounds)
-                return "[작업이 중단되었습니다]"
-
-            response = await self._ai_client.chat(
-                system=full_system,
-                messages=messages,
-            )
-
-            # Check again after CLI call returns (cancel may have arrived during wait)
-            if cancel_event and cancel_event.is_set():
-                logger.info("tool_loop_cancelled_after_chat", bot_id=bot_id, round=rounds)
-                return "[작업이 중단되었습니다]"
-
-            response_text = response.text
-
-            # Check for tool calls in the response
-            tool_calls = TOOL_CALL_PATTERN.findall(response_text)
-
-            if not tool_calls:
-                # No tool calls - this is the final response
-                # Clean up any residual tags
-                final_text = response_text.strip()
+        try:
+            while rounds < MAX_TOOL_ROUNDS:
+                response = await self._ai_client.chat(
+                    system=full_system,
+                    messages=messages,
+                )
 
-                await repo.save_turn(
-                    ConversationRecord(
-                        bot_id=bot_id,
-                        session_id=session_id,
-                        chat_id=chat_id,
-                        role="assistant",
-                        content=final_text,
-                        token_input=response.input_tokens,
-                        token_output=response.output_tokens,
+                response_text = response.text
+
+                # Check for tool calls in the response; calls are scanned lazily,
+                # peeking at the first one to tell a final answer from a tool round
+                tool_calls = _iter_tool_calls(response_text)
+                first_call = next(tool_calls, None)
+
+                if first_call is None:
+                    # No tool calls - this is the final response
+                    # Clean up any residual tags
+                    final_text = response_text.strip()
+
+                    repo.save_turn_nowait(
+                        ConversationRecord(
+                            bot_id=bot_id,
+                            session_id=session_id,
+                            chat_id=chat_id,
+                            role="assistant",
+                            content=final_text,
+                            token_input=response.input_tokens,
+                            token_output=response.output_tokens,
+                        )
                     )
-                )
-                return final_text
+                    return final_text, not response.error
 
-            # Process tool calls
-            # Add assistant response to messages
-            messages.append({"role": "assistant", "content": response_text})
+                # Process tool calls
+                # Add assistant response to messages
+                messages.append({"role": "assistant", "content": response_text})
 
-            # Save assistant tool request as regular assistant message
-            # (tool_use/tool_result roles are for Anthropic API backend only)
-            await repo.save_turn(
-                ConversationRecord(
+                # Assistant tool request, saved together with the tool results below
+                # as a regular assistant message
+                # (tool_use/tool_result roles are for Anthropic API backend only)
+                request_record = ConversationRecord(
                     bot_id=bot_id,
                     session_id=session_id,
                     chat_id=chat_id,
                     role="assistant",
                     content=response_text,
                 )
-            )
 
-            # Execute each tool call and collect results
-            tool_results: list[str] = []
-            for call_json in tool_calls:
-                # Check for cancellation before each tool execution
-                if cancel_event and cancel_event.is_set():
-                    logger.info("tool_execution_cancelled", bot_id=bot_id)
-                    return "[작업이 중단되었습니다]"
-
-                try:
-                    call_data = json.loads(call_json)
+                # Execute the tool calls. Serial tools run one at a time in issue
+                # order and act as barriers; the calls between them run concurrently.
+                tool_results: list[str] = []
+                batch: list[Any] = []  # pending calls, as zero-argument coroutine factories
+
+                async def run_batch() -> None:
+                    nonlocal batch
+                    calls, batch = batch, []
+                    tool_results.extend(await asyncio.gather(*(call() for call in calls)))
+
+                for call_json in itertools.chain((first_call,), tool_calls):
+                    try:
+                        call_data = orjson.loads(call_json)
+                    except orjson.JSONDecodeError as e:
+                        batch.append(functools.partial(_tool_error, e))
+                        continue
+                    # The payload is brace-delimited, so call_data is a dict
                     tool_name = call_data.get("tool", "")
                     tool_input = call_data.get("input", {})
+                    if not isinstance(tool_name, str) or not isinstance(tool_input, dict):
+                        batch.append(functools.partial(_tool_error, _BAD_TOOL_CALL))
+                        continue
 
                     tool = self._tool_registry.get(tool_name)
-                    if tool is None:
-                        result = f"Error: unknown tool '{tool_name}'"
+                    call = functools.partial(_run_tool_call, tool, tool_name, tool_input)
+                    if tool is not None and tool.requires_serial:
+                        if batch:
+                            await run_batch()
+                        tool_results.append(await call())
                     else:
-                        logger.info("tool_execute", tool=tool_name)
-                        result = await tool.execute(**tool_input)
-
-                    tool_results.append(f"[Tool Result: {tool_name}]\n{result}")
-                except asyncio.CancelledError:
-                    logger.info("tool_execution_cancelled", bot_id=bot_id, tool=tool_name)
-                    return "[작업이 중단되었습니다]"
-                except (json.JSONDecodeError, Exception) as e:
-                    tool_results.append(f"[Tool Error]\n{e}")
-
-            # Build tool results message
-            results_text = "\n\n".join(tool_results)
-
-            # Save tool results as regular user message
-            # (tool_use/tool_result roles are for Anthropic API backend only)
-            await repo.save_turn(
-                ConversationRecord(
-                    bot_id=bot_id,
-                    session_id=session_id,
-                    chat_id=chat_id,
-                    role="user",
-                    content=results_text,
-                )
-            )
+                        batch.append(call)
+
+                if batch:
+                    await run_batch()
+
+                # Build tool results message
+                results_text = "\n\n".join(tool_results)
 
-            # Add tool results as user message for next round
-            messages.append({"role": "user", "content": results_text})
-            rounds += 1
+                # Save the tool request and its results (as a regular user message)
+                # in one batch
+                await repo.save_turns([
+                    request_record,
+                    ConversationRecord(
+                        bot_id=bot_id,
+                        session_id=session_id,
+                        chat_id=chat_id,
+                        role="user",
+                        content=results_text,
+                    ),
+                ])
 
-        return "[Tool execution limit reached]"
+                # Add tool results as user message for next round
+                messages.append({"role": "user", "content": results_text})
+                rounds += 1
+
+            return "[Tool execution limit reached]", False
+        except asyncio.CancelledError:
+            logger.info("tool_loop_cancelled", bot_id=bot_id, round=rounds)
+            raise
+
+
+def _iter_tool_calls(text: str) -> Iterator[str]:
+    """Yield the JSON object text of each <tool_call>{...}</tool_call> in *text*.
+
+    A str.find scan that visits each character a bounded number of times;
+    tags whose body isn't brace-delimited are skipped.
+    """
+    pos = 0
+    while True:
+        start = text.find(_TOOL_CALL_OPEN, pos)
+        if start < 0:
+            return
+        body = start + len(_TOOL_CALL_OPEN)
+        n = len(text)
+        while body < n and text[body].isspace():
+            body += 1
+        if text[body:body + 1] != "{":
+            pos = body
+            continue
+        end = text.find(_TOOL_CALL_CLOSE, body)
+        if end < 0:
+            return
+        pos = end + len(_TOOL_CALL_CLOSE)
+        payload = text[body:end].rstrip()
+        if payload[-1] == "}":
+            yield payload
+
+
+async def _tool_error(error: Exception | str) -> str:
+    return f"[Tool Error]\n{error}"
+
+
+async def _run_tool_call(tool: Tool | None, tool_name: str, tool_input: Any) -> str:
+    """Execute one parsed <tool_call> and format its result for the model."""
+    if tool is None:
+        return f"[Tool Result: {tool_name}]\nError: unknown tool '{tool_name}'"
+    try:
+        logger.info("tool_execute", tool=tool_name)
+        result = await tool.execute(**tool_input)
+    except Exception as e:
+        return f"[Tool Error]\n{e}"
+    return f"[Tool Result: {tool_name}]\n{result}"
+
+
+def _dump_attachment(att: Attachment) -> str:
+    """Write an attachment to a temp file and return its path (blocking)."""
+    ext = att.media_type.split("/")[-1] if "/" in att.media_type else "bin"
+    fd, path = tempfile.mkstemp(suffix=f".{ext}", prefix=_TMP_PREFIX)
+    try:
+        # Unbuffered: the bytes go straight to the kernel; os.write may be partial
+        view = memoryview(att.data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+    return path
+
+
+def _remove_files(paths: list[str]) -> None:
+    """Delete files, ignoring ones that are already gone (blocking)."""
+    for path in paths:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
 
 
-def _split_message(text: str, max_length: int = 4000) -> list[str]:
+def _split_message(text: str, max_length: int = _MAX_CHUNK) -> list[str]:
     """Split a message into chunks that fit within platform limits."""
-    if len(text) <= max_length:
+    n = len(text)
+    if n <= max_length:
         return [text]
 
+    # Walk a cursor through the text so each chunk is sliced exactly once
     chunks = []
-    while text:
-        if len(text) <= max_length:
-            chunks.append(text)
+    pos = 0
+    while pos < n:
+        end = pos + max_length
+        if end >= n:
+            chunks.append(text[pos:])
             break
         # Try to split at a newline
-        split_pos = text.rfind("\n", 0, max_length)
+        split_pos = text.rfind("\n", pos, end)
         if split_pos == -1:
-            split_pos = max_length
-        chunks.append(text[:split_pos])
-        text = text[split_pos:].lstrip("\n")
+            split_pos = end
+        chunks.append(text[pos:split_pos])
+        # Drop the newlines at the split point
+        pos = split_pos
+        while pos < n and text[pos] == "\n":
+            pos += 1
     return chunks
@@ -0,0 +1,52 @@
+"""In-memory cache of AI replies to identical requests."""
+
+from __future__ import annotations
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+import orjson
+
+
+class ResponseCache:
+    """Exact-match reply cache with a TTL and an LRU size cap.
+
+    Keys cover the system prompt and the full message list, so a hit means
+    the model would have been sent exactly the same request. Only safe for
+    bots without tools, whose replies have no side effects.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 256):
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._entries: OrderedDict[bytes, tuple[float, str]] = OrderedDict()
+
+    @staticmethod
+    def make_key(system: str, messages: list[dict[str, Any]]) -> Optional[bytes]:
+        """Return the cache key for a request, or None if it can't be serialized."""
+        try:
+            payload = orjson.dumps([system, messages])
+        except TypeError:
+            return None
+        return hashlib.blake2b(payload, digest_size=16).digest()
+
+    def get(self, key: bytes) -> Optional[str]:
+        """Return the cached reply for *key* if present and not expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, response = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return response
+
+    def set(self, key: bytes, response: str) -> None:
+        """Store *response* under *key*, evicting the least recently used entry."""
+        self._entries[key] = (time.monotonic() + self._ttl, response)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
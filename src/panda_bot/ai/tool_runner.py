@@ -3,9 +3,10 @@
 from __future__ import annotations
 
 import asyncio
-import json
 from typing import Any
 
+import orjson
+
 from panda_bot.ai.client import AnthropicClient
 from panda_bot.ai.tools.base import Tool
 from panda_bot.ai.tools.registry import ToolRegistry
@@ -53,51 +54,33 @@ async def run_tool_loop(
             temperature=temperature,
         )
 
-        # Extract content blocks
-        content_blocks = response.content
-        tool_use_blocks = [b for b in content_blocks if b.type == "tool_use"]
-        text_blocks = [b for b in content_blocks if b.type == "text"]
-
-        # Save assistant tool_use records
-        for block in tool_use_blocks:
-            await conversation_repo.save_turn(
-                ConversationRecord(
-                    bot_id=bot_id,
-                    session_id=session_id,
-                    chat_id=chat_id,
-                    role="tool_use",
-                    content=json.dumps(block.input),
-                    model=model,
-                    token_input=response.usage.input_tokens,
-                    token_output=response.usage.output_tokens,
-                    tool_name=block.name,
-                    tool_call_id=block.id,
+        # Sort the content blocks in one pass: tool calls, text, and the
+        # assistant message content that echoes both in order
+        tool_use_blocks: list[Any] = []
+        texts: list[str] = []
+        assistant_content: list[dict[str, Any]] = []
+        for block in response.content:
+            if block.type == "text":
+                texts.append(block.text)
+                assistant_content.append({"type": "text", "text": block.text})
+            elif block.type == "tool_use":
+                tool_use_blocks.append(block)
+                assistant_content.append(
+                    {
+                        "type": "tool_use",
+                        "id": block.id,
+                        "name": block.name,
+                        "input": block.input,
+                    }
                 )
-            )
 
-        # Build assistant message for conversation
-        if tool_use_blocks:
-            assistant_content: list[dict[str, Any]] = []
-            for block in content_blocks:
-                if block.type == "text":
-                    assistant_content.append({"type": "text", "text": block.text})
-                elif block.type == "tool_use":
-                    assistant_content.append(
-                        {
-                            "type": "tool_use",
-                            "id": block.id,
-                            "name": block.name,
-                            "input": block.input,
-                        }
-                    )
-            messages.append({"role": "assistant", "content": assistant_content})
-        else:
+        if not tool_use_blocks:
             # Text-only response
-            final_text = "\n".join(b.text for b in text_blocks)
+            final_text = "\n".join(texts)
             messages.append({"role": "assistant", "content": final_text})
 
             # Save assistant text
-            await conversation_repo.save_turn(
+            conversation_repo.save_turn_nowait(
                 ConversationRecord(
                     bot_id=bot_id,
                     session_id=session_id,
@@ -111,15 +94,31 @@ async def run_tool_loop(
             )
             return final_text
 
-        if not tool_use_blocks:
-            break
+        messages.append({"role": "assistant", "content": assistant_content})
+
+        # Assistant tool_use records; saved together with their results below
+        tool_use_records = [
+            ConversationRecord(
+                bot_id=bot_id,
+                session_id=session_id,
+                chat_id=chat_id,
+                role="tool_use",
+                content=orjson.dumps(block.input).decode(),
+                model=model,
+                token_input=response.usage.input_tokens,
+                token_output=response.usage.output_tokens,
+                tool_name=block.name,
+                tool_call_id=block.id,
+            )
+            for block in tool_use_blocks
+        ]
 
         # Check for cancellation before executing tools
         if cancel_event and cancel_event.is_set():
             logger.info("tool_loop_cancelled_before_exec", bot_id=bot_id)
             return "[작업이 중단되었습니다]"
 
-        # Execute tool calls concurrently
+        # Execute tool calls; see Tool.requires_serial for the ordering rules
         async def _execute_one(block: Any) -> tuple[str, str]:
             if cancel_event and cancel_event.is_set():
                 return block.id, "[Cancelled]"
@@ -135,16 +134,62 @@ async def run_tool_loop(
                 logger.error("tool_execution_error", tool=block.name, error=str(e))
                 return block.id, f"Error executing {block.name}: {e}"
 
-        results = await asyncio.gather(*(_execute_one(b) for b in tool_use_blocks))
-
-        # Save tool results and build message
+        async def _execute_all() -> list[tuple[str, str]]:
+            # Serial tools run alone, in issue order, as barriers; the calls
+            # between them run concurrently. Every group runs in a TaskGroup,
+            # so cancelling this task also skips the groups not yet started.
+            groups: list[list[Any]] = [[]]
+            for block in tool_use_blocks:
+                tool = tool_registry.get(block.name)
+                if tool is not None and tool.requires_serial:
+                    groups.append([block])
+                    groups.append([])
+                else:
+                    groups[-1].append(block)
+            results: list[tuple[str, str]] = []
+            for group in groups:
+                if not group:
+                    continue
+                async with asyncio.TaskGroup() as tg:
+                    tasks = [tg.create_task(_execute_one(b)) for b in group]
+                results.extend(t.result() for t in tasks)
+            return results
+
+        if cancel_event is None:
+            results = await _execute_all()
+        else:
+            # Race the tools against the cancel event so a stop request doesn't
+            # wait for the slowest tool to finish
+            exec_task = asyncio.create_task(_execute_all())
+            cancel_task = asyncio.create_task(cancel_event.wait())
+            try:
+                await asyncio.wait(
+                    {exec_task, cancel_task}, return_when=asyncio.FIRST_COMPLETED
+                )
+            except asyncio.CancelledError:
+                exec_task.cancel()
+                await asyncio.gather(exec_task, return_exceptions=True)
+                raise
+            finally:
+                cancel_task.cancel()
+            if not exec_task.done():
+                exec_task.cancel()
+                await asyncio.gather(exec_task, return_exceptions=True)
+                logger.info("tool_loop_cancelled_during_exec", bot_id=bot_id)
+                return "[작업이 중단되었습니다]"
+            results = exec_task.result()
+
+        # Save the round's tool_use and tool_result records in one batch, and
+        # build the results message
+        records = tool_use_records
         tool_result_content: list[dict[str, Any]] = []
+        blocks_by_id = {b.id: b for b in tool_use_blocks}
         for tool_use_id, result_text in results:
             # Find matching tool_use block for metadata
-            matching_block = next((b for b in tool_use_blocks if b.id == tool_use_id), None)
+            matching_block = blocks_by_id.get(tool_use_id)
             tool_name = matching_block.name if matching_block else None
 
-            await conversation_repo.save_turn(
+            records.append(
                 ConversationRecord(
                     bot_id=bot_id,
                     session_id=session_id,
@@ -164,6 +209,7 @@ async def run_tool_loop(
                 }
             )
 
+        await conversation_repo.save_turns(records)
         messages.append({"role": "user", "content": tool_result_content})
         rounds += 1
 
@@ -12,6 +12,14 @@ if TYPE_CHECKING:
 class Tool(ABC):
     """Base class for all Claude-callable tools."""
 
+    # Stateful tools whose calls must run one at a time, in the order the
+    # model issued them (e.g. a browser login sequence). Other calls from the
+    # same response may run concurrently between them.
+    requires_serial: bool = False
+
+    # to_api_dict() result, built on first use
+    _api_dict: dict[str, Any] | None = None
+
     def __init__(self) -> None:
         self._pending_images: list[Attachment] = []
 
@@ -51,9 +59,20 @@ class Tool(ABC):
         return images
 
     def to_api_dict(self) -> dict[str, Any]:
-        """Serialize to the Anthropic API tool definition format."""
-        return {
-            "name": self.name,
-            "description": self.description,
-            "input_schema": self.input_schema,
-        }
+        """Serialize to the Anthropic API tool definition format.
+
+        Built once per instance; a tool whose name, description or schema
+        changes must call invalidate_api_dict().
+        """
+        api_dict = self._api_dict
+        if api_dict is None:
+            api_dict = self._api_dict = {
+                "name": self.name,
+                "description": self.description,
+                "input_schema": self.input_schema,
+            }
+        return api_dict
+
+    def invalidate_api_dict(self) -> None:
+        """Drop the cached to_api_dict() result."""
+        self._api_dict = None
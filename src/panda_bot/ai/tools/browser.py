@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 import json
-from typing import Any
+from typing import Any, ClassVar
 
 from panda_bot.ai.tools.base import Tool
 from panda_bot.services.browser import BrowserService
@@ -17,9 +17,79 @@ class BrowserTool(Tool):
     Popup windows are auto-detected and can be managed with list_pages/switch_page/close_page.
     """
 
+    requires_serial = True
+
+    # Static schema, built once at import; shared by every instance
+    _INPUT_SCHEMA: ClassVar[dict[str, Any]] = {
+        "type": "object",
+        "properties": {
+            "action": {
+                "type": "string",
+                "enum": [
+                    "open", "html", "screenshot", "evaluate", "click", "fill",
+                    "clear_session", "list_pages", "switch_page", "close_page",
+                ],
+                "description": (
+                    "Action to perform: "
+                    "'open' = get text content, "
+                    "'html' = get raw HTML, "
+                    "'screenshot' = take a screenshot, "
+                    "'evaluate' = run JavaScript, "
+                    "'click' = click an element and extract content (auto-detects popups), "
+                    "'fill' = fill a form field (input/textarea), "
+                    "'clear_session' = clear cookies and session data, "
+                    "'list_pages' = list all open pages (main + popups), "
+                    "'switch_page' = switch to a page by index, "
+                    "'close_page' = close current page and switch back"
+                ),
+            },
+            "url": {
+                "type": "string",
+                "description": "URL to navigate to. Optional — if omitted, operates on the current page.",
+            },
+            "script": {
+                "type": "string",
+                "description": "JavaScript code to evaluate (for 'evaluate' action)",
+            },
+            "selector": {
+                "type": "string",
+                "description": "CSS selector for the target element (for 'click' and 'fill' actions)",
+            },
+            "value": {
+                "type": "string",
+                "description": "Value to fill into the form field (for 'fill' action)",
+            },
+            "extract_selector": {
+                "type": "string",
+                "description": "CSS selector for content extraction after click (optional)",
+            },
+            "full_page": {
+                "type": "boolean",
+                "description": "Whether to capture full page screenshot (default: false)",
+            },
+            "page_index": {
+                "type": "integer",
+                "description": "Page index for 'switch_page' action (from 'list_pages' result)",
+            },
+        },
+        "required": ["action"],
+    }
+
     def __init__(self, browser_service: BrowserService):
         super().__init__()
         self._browser = browser_service
+        self._actions = {
+            "open": self._open,
+            "html": self._html,
+            "screenshot": self._screenshot,
+            "evaluate": self._evaluate,
+            "click": self._click,
+            "fill": self._fill,
+            "clear_session": self._clear_session,
+            "list_pages": self._list_pages,
+            "switch_page": self._switch_page,
+            "close_page": self._close_page,
+        }
 
     @property
     def name(self) -> str:
@@ -39,110 +109,73 @@ class BrowserTool(Tool):
 
     @property
     def input_schema(self) -> dict[str, Any]:
-        return {
-            "type": "object",
-            "properties": {
-                "action": {
-                    "type": "string",
-                    "enum": [
-                        "open", "html", "screenshot", "evaluate", "click", "fill",
-                        "clear_session", "list_pages", "switch_page", "close_page",
-                    ],
-                    "description": (
-                        "Action to perform: "
-                        "'open' = get text content, "
-                        "'html' = get raw HTML, "
-                        "'screenshot' = take a screenshot, "
-                        "'evaluate' = run JavaScript, "
-                        "'click' = click an element and extract content (auto-detects popups), "
-                        "'fill' = fill a form field (input/textarea), "
-                        "'clear_session' = clear cookies and session data, "
-                        "'list_pages' = list all open pages (main + popups), "
-                        "'switch_page' = switch to a page by index, "
-                        "'close_page' = close current page and switch back"
-                    ),
-                },
-                "url": {
-                    "type": "string",
-                    "description": "URL to navigate to. Optional — if omitted, operates on the current page.",
-                },
-                "script": {
-                    "type": "string",
-                    "description": "JavaScript code to evaluate (for 'evaluate' action)",
-                },
-                "selector": {
-                    "type": "string",
-                    "description": "CSS selector for the target element (for 'click' and 'fill' actions)",
-                },
-                "value": {
-                    "type": "string",
-                    "description": "Value to fill into the form field (for 'fill' action)",
-                },
-                "extract_selector": {
-                    "type": "string",
-                    "description": "CSS selector for content extraction after click (optional)",
-                },
-                "full_page": {
-                    "type": "boolean",
-                    "description": "Whether to capture full page screenshot (default: false)",
-                },
-                "page_index": {
-                    "type": "integer",
-                    "description": "Page index for 'switch_page' action (from 'list_pages' result)",
-                },
-            },
-            "required": ["action"],
-        }
+        return self._INPUT_SCHEMA
 
     async def execute(self, **kwargs: Any) -> str:
-        action = kwargs.get("action", "open")
-        url = kwargs.get("url") or None
+        action = kwargs.pop("action", "open")
+        url = kwargs.pop("url", None) or None
 
+        # The model may send a non-string action; a list would be unhashable
+        handler = self._actions.get(action) if isinstance(action, str) else None
+        if handler is None:
+            return f"Error: unknown action '{action}'"
         try:
-            match action:
-                case "open":
-                    return await self._browser.open_page(url)
-                case "html":
-                    return await self._browser.get_html(url)
-                case "screenshot":
-                    full_page = kwargs.get("full_page", False)
-                    screenshot_bytes = await self._browser.screenshot(url, full_page=full_page)
-                    self.add_pending_image(screenshot_bytes, "image/png", "screenshot.png")
-                    return f"Screenshot taken ({len(screenshot_bytes)} bytes). Image will be sent to user."
-                case "evaluate":
-                    script = kwargs.get("script", "")
-                    if not script:
-                        return "Error: script is required for evaluate action"
-                    return await self._browser.evaluate_script(script, url)
-                case "click":
-                    selector = kwargs.get("selector", "")
-                    if not selector:
-                        return "Error: selector is required for click action"
-                    extract_selector = kwargs.get("extract_selector")
-                    return await self._browser.click_and_extract(
-                        selector, url, extract_selector
-                    )
-                case "fill":
-                    selector = kwargs.get("selector", "")
-                    value = kwargs.get("value", "")
-                    if not selector:
-                        return "Error: selector is required for fill action"
-                    if not value:
-                        return "Error: value is required for fill action"
-                    return await self._browser.fill(selector, value, url)
-                case "clear_session":
-                    return await self._browser.clear_session()
-                case "list_pages":
-                    pages = await self._browser.list_pages()
-                    return json.dumps(pages, indent=2, ensure_ascii=False)
-                case "switch_page":
-                    page_index = kwargs.get("page_index")
-                    if page_index is None:
-                        return "Error: page_index is required for switch_page action"
-                    return await self._browser.switch_page(int(page_index))
-                case "close_page":
-                    return await self._browser.close_page()
-                case _:
-                    return f"Error: unknown action '{action}'"
+            return await handler(url, **kwargs)
         except Exception as e:
             return f"Browser error: {e}"
+
+    # Action handlers: each takes the target url plus its own parameters, and
+    # ignores parameters meant for other actions
+
+    async def _open(self, url: str | None, **_: Any) -> str:
+        return await self._browser.open_page(url)
+
+    async def _html(self, url: str | None, **_: Any) -> str:
+        return await self._browser.get_html(url)
+
+    async def _screenshot(self, url: str | None, full_page: bool = False, **_: Any) -> str:
+        screenshot_bytes = await self._browser.screenshot(url, full_page=full_page)
+        self.add_pending_image(screenshot_bytes, "image/png", "screenshot.png")
+        return f"Screenshot taken ({len(screenshot_bytes)} bytes). Image will be sent to user."
+
+    async def _evaluate(self, url: str | None, script: str = "", **_: Any) -> str:
+        if not script:
+            return "Error: script is required for evaluate action"
+        return await self._browser.evaluate_script(script, url)
+
+    async def _click(
+        self,
+        url: str | None,
+        selector: str = "",
+        extract_selector: str | None = None,
+        **_: Any,
+    ) -> str:
+        if not selector:
+            return "Error: selector is required for click action"
+        return await self._browser.click_and_extract(selector, url, extract_selector)
+
+    async def _fill(
+        self, url: str | None, selector: str = "", value: str = "", **_: Any
+    ) -> str:
+        if not selector:
+            return "Error: selector is required for fill action"
+        if not value:
+            return "Error: value is required for fill action"
+        return await self._browser.fill(selector, value, url)
+
+    async def _clear_session(self, url: str | None, **_: Any) -> str:
+        return await self._browser.clear_session()
+
+    async def _list_pages(self, url: str | None, **_: Any) -> str:
+        pages = await self._browser.list_pages()
+        return json.dumps(pages, indent=2, ensure_ascii=False)
+
+    async def _switch_page(
+        self, url: str | None, page_index: int | None = None, **_: Any
+    ) -> str:
+        if page_index is None:
+            return "Error: page_index is required for switch_page action"
+        return await self._browser.switch_page(int(page_index))
+
+    async def _close_page(self, url: str | None, **_: Any) -> str:
+        return await self._browser.close_page()
@@ -3,16 +3,88 @@
 from __future__ import annotations
 
 import asyncio
+import os
 import shlex
+import signal
 from pathlib import Path
-from typing import Any
+from typing import Any, ClassVar
 
 from panda_bot.ai.tools.base import Tool
 
+# Output kept for the model, in characters. The first N characters of UTF-8
+# text (bad bytes decode to one U+FFFD each) never take more than 4*N bytes.
+_STDOUT_CHARS = 20000
+_STDERR_CHARS = 5000
+# Pipe reader buffer limit (asyncio default: 64 KiB); a larger buffer lets each
+# wakeup move more of a verbose command's output
+_PIPE_LIMIT = 1 << 20
+_READ_CHUNK = _PIPE_LIMIT
+
+
+async def _read_head(stream: asyncio.StreamReader, max_bytes: int) -> bytes:
+    """Read *stream* to EOF, keeping only its first *max_bytes* bytes.
+
+    The rest is read and dropped so the child never blocks on a full pipe.
+    """
+    buf = bytearray()
+    while chunk := await stream.read(_READ_CHUNK):
+        if len(buf) < max_bytes:
+            buf += chunk[:max_bytes - len(buf)]
+    return bytes(buf)
+
+
+def _kill(process: asyncio.subprocess.Process) -> None:
+    """Kill the command along with anything it started (e.g. a shell's children).
+
+    Commands run in their own session, so on POSIX the whole process group
+    can be signalled; elsewhere only the direct child is killed.
+    """
+    try:
+        if os.name == "posix":
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except ProcessLookupError:
+        pass
+
 
 class ExecutorTool(Tool):
     """Tool for executing files and commands."""
 
+    requires_serial = True
+
+    _INPUT_SCHEMA: ClassVar[dict[str, Any]] = {
+        "type": "object",
+        "properties": {
+            "command": {
+                "type": "string",
+                "description": "The command or file path to execute",
+            },
+            "args": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "Arguments to pass to the command",
+            },
+            "cwd": {
+                "type": "string",
+                "description": "Working directory for execution (default: current directory)",
+            },
+            "timeout": {
+                "type": "integer",
+                "description": "Timeout in seconds (default: 30, max: 300)",
+            },
+            "shell": {
+                "type": "boolean",
+                "description": (
+                    "Run through the system shell (default: true). Set to false to "
+                    "run command directly as the program with args, skipping shell "
+                    "parsing; ~, $VARS and shell builtins then don't work"
+                ),
+            },
+        },
+        "required": ["command"],
+    }
+
     @property
     def name(self) -> str:
         return "executor"
@@ -26,29 +98,7 @@ class ExecutorTool(Tool):
 
     @property
     def input_schema(self) -> dict[str, Any]:
-        return {
-            "type": "object",
-            "properties": {
-                "command": {
-                    "type": "string",
-                    "description": "The command or file path to execute",
-                },
-                "args": {
-                    "type": "array",
-                    "items": {"type": "string"},
-                    "description": "Arguments to pass to the command",
-                },
-                "cwd": {
-                    "type": "string",
-                    "description": "Working directory for execution (default: current directory)",
-                },
-                "timeout": {
-                    "type": "integer",
-                    "description": "Timeout in seconds (default: 30, max: 300)",
-                },
-            },
-            "required": ["command"],
-        }
+        return self._INPUT_SCHEMA
 
     async def execute(self, **kwargs: Any) -> str:
         command = kwargs.get("command", "")
@@ -59,34 +109,67 @@ class ExecutorTool(Tool):
         if not command:
             return "Error: command is required"
 
+        # shell=false spawns the program directly, saving the shell process
+        # and its re-parse of the quoted args
+        use_shell = kwargs.get("shell", True) is not False
+
         try:
-            # Build the full command
-            if args:
-                full_cmd = f"{command} {' '.join(shlex.quote(a) for a in args)}"
+            if use_shell:
+                # Build the full command
+                if args:
+                    full_cmd = f"{command} {' '.join(shlex.quote(a) for a in args)}"
+                else:
+                    full_cmd = command
+
+                process = await asyncio.create_subprocess_shell(
+                    full_cmd,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    cwd=cwd,
+                    limit=_PIPE_LIMIT,
+                    start_new_session=True,
+                )
             else:
-                full_cmd = command
+                process = await asyncio.create_subprocess_exec(
+                    command,
+                    *args,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    cwd=cwd,
+                    limit=_PIPE_LIMIT,
+                    start_new_session=True,
+                )
 
-            process = await asyncio.create_subprocess_shell(
-                full_cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                cwd=cwd,
+            reads = asyncio.gather(
+                _read_head(process.stdout, 4 * _STDOUT_CHARS),
+                _read_head(process.stderr, 4 * _STDERR_CHARS),
+                process.wait(),
             )
-
             try:
-                stdout, stderr = await asyncio.wait_for(
-                    process.communicate(), timeout=timeout
-                )
+                # Drain both pipes into bounded buffers rather than communicate(),
+                # which would hold the entire output in memory
+                stdout, stderr, _ = await asyncio.wait_for(reads, timeout=timeout)
             except asyncio.TimeoutError:
-                process.kill()
+                _kill(process)
                 return f"Error: command timed out after {timeout} seconds"
+            except asyncio.CancelledError:
+                # /stop: don't leave the command running with nobody draining
+                # its pipes. wait_for has already cancelled the reads; collect
+                # them so their CancelledError isn't reported as unretrieved.
+                _kill(process)
+                await asyncio.gather(reads, return_exceptions=True)
+                try:
+                    await asyncio.wait_for(process.wait(), timeout=2.0)
+                except (asyncio.TimeoutError, asyncio.CancelledError):
+                    pass
+                raise
 
             output_parts = []
             if stdout:
-                stdout_text = stdout.decode("utf-8", errors="replace")[:20000]
+                stdout_text = stdout.decode("utf-8", errors="replace")[:_STDOUT_CHARS]
                 output_parts.append(f"STDOUT:\n{stdout_text}")
             if stderr:
-                stderr_text = stderr.decode("utf-8", errors="replace")[:5000]
+                stderr_text = stderr.decode("utf-8", errors="replace")[:_STDERR_CHARS]
                 output_parts.append(f"STDERR:\n{stderr_text}")
 
             exit_info = f"Exit code: {process.returncode}"
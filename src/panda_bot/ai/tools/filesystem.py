@@ -2,19 +2,88 @@
 
 from __future__ import annotations
 
+import fnmatch
+import functools
 import io
 import mimetypes
 import os
+import re
+import stat
+import time
 import zipfile
+from collections import deque
 from pathlib import Path
-from typing import Any
+from typing import Any, ClassVar
 
 from panda_bot.ai.tools.base import Tool
 
+# How long a directory listing may be reused, and how many are kept
+_LIST_CACHE_TTL = 5.0
+_LIST_CACHE_SIZE = 128
+
+
+@functools.lru_cache(maxsize=512)
+def _resolve(path_str: str) -> Path:
+    """Path(path_str).resolve(), memoized; the process never changes directory."""
+    return Path(path_str).resolve()
+
+
+def _stat(path: Path) -> os.stat_result | None:
+    """Stat *path* once, or None if it doesn't exist (permission errors propagate)."""
+    try:
+        return os.stat(path)
+    except PermissionError:
+        raise
+    except (OSError, ValueError):
+        return None
+
 
 class FileSystemTool(Tool):
     """Tool for exploring the file system: listing directories, reading files, searching."""
 
+    _INPUT_SCHEMA: ClassVar[dict[str, Any]] = {
+        "type": "object",
+        "properties": {
+            "action": {
+                "type": "string",
+                "enum": ["list", "read", "info", "search", "send_file", "compress"],
+                "description": (
+                    "'list' = list directory contents, "
+                    "'read' = read file content as text, "
+                    "'info' = get file/directory metadata, "
+                    "'search' = search for files by name pattern, "
+                    "'send_file' = send a file to the user via messenger (supports any file type), "
+                    "'compress' = compress file(s) or directory into a zip and send to user"
+                ),
+            },
+            "path": {
+                "type": "string",
+                "description": "File or directory path",
+            },
+            "paths": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "Multiple file/directory paths (for 'compress' action). "
+                               "If provided, these are added to the zip archive.",
+            },
+            "pattern": {
+                "type": "string",
+                "description": "Search pattern (glob, for 'search' action). "
+                               "For 'compress', filters files in a directory by glob pattern.",
+            },
+            "max_depth": {
+                "type": "integer",
+                "description": "Maximum directory depth for search (default: 3)",
+            },
+        },
+        "required": ["action", "path"],
+    }
+
+    def __init__(self) -> None:
+        super().__init__()
+        # Directory listings by path: (expires_at, dir mtime_ns, listing text)
+        self._list_cache: dict[str, tuple[float, int, str]] = {}
+
     @property
     def name(self) -> str:
         return "filesystem"
@@ -28,50 +97,14 @@ class FileSystemTool(Tool):
 
     @property
     def input_schema(self) -> dict[str, Any]:
-        return {
-            "type": "object",
-            "properties": {
-                "action": {
-                    "type": "string",
-                    "enum": ["list", "read", "info", "search", "send_file", "compress"],
-                    "description": (
-                        "'list' = list directory contents, "
-                        "'read' = read file content as text, "
-                        "'info' = get file/directory metadata, "
-                        "'search' = search for files by name pattern, "
-                        "'send_file' = send a file to the user via messenger (supports any file type), "
-                        "'compress' = compress file(s) or directory into a zip and send to user"
-                    ),
-                },
-                "path": {
-                    "type": "string",
-                    "description": "File or directory path",
-                },
-                "paths": {
-                    "type": "array",
-                    "items": {"type": "string"},
-                    "description": "Multiple file/directory paths (for 'compress' action). "
-                                   "If provided, these are added to the zip archive.",
-                },
-                "pattern": {
-                    "type": "string",
-                    "description": "Search pattern (glob, for 'search' action). "
-                                   "For 'compress', filters files in a directory by glob pattern.",
-                },
-                "max_depth": {
-                    "type": "integer",
-                    "description": "Maximum directory depth for search (default: 3)",
-                },
-            },
-            "required": ["action", "path"],
-        }
+        return self._INPUT_SCHEMA
 
     async def execute(self, **kwargs: Any) -> str:
         action = kwargs.get("action", "list")
         path_str = kwargs.get("path", ".")
 
         try:
-            path = Path(path_str).resolve()
+            path = _resolve(path_str)
 
             match action:
                 case "list":
@@ -97,13 +130,33 @@ class FileSystemTool(Tool):
         except Exception as e:
             return f"Error: {e}"
 
-    @staticmethod
-    def _list_dir(path: Path) -> str:
-        if not path.is_dir():
+    def _list_dir(self, path: Path) -> str:
+        st = _stat(path)
+        if st is None or not stat.S_ISDIR(st.st_mode):
             return f"Error: '{path}' is not a directory"
 
+        # Reuse a recent listing while the directory's mtime is unchanged; the
+        # TTL bounds staleness from file size changes, which don't touch it
+        key = str(path)
+        mtime_ns = st.st_mtime_ns
+        now = time.monotonic()
+        cached = self._list_cache.get(key)
+        if cached is not None and cached[0] > now and cached[1] == mtime_ns:
+            return cached[2]
+        listing = self._build_listing(path)
+        self._list_cache.pop(key, None)
+        self._list_cache[key] = (now + _LIST_CACHE_TTL, mtime_ns, listing)
+        if len(self._list_cache) > _LIST_CACHE_SIZE:
+            del self._list_cache[next(iter(self._list_cache))]
+        return listing
+
+    @staticmethod
+    def _build_listing(path: Path) -> str:
+        # scandir entries answer is_dir()/is_file() from the listing itself
+        with os.scandir(path) as it:
+            dir_entries = sorted(it, key=lambda e: os.path.normcase(e.name))
         entries = []
-        for entry in sorted(path.iterdir()):
+        for entry in dir_entries:
             entry_type = "DIR" if entry.is_dir() else "FILE"
             size = ""
             if entry.is_file():
@@ -117,10 +170,11 @@ class FileSystemTool(Tool):
 
     @staticmethod
     def _read_file(path: Path) -> str:
-        if not path.is_file():
+        st = _stat(path)
+        if st is None or not stat.S_ISREG(st.st_mode):
             return f"Error: '{path}' is not a file"
 
-        size = path.stat().st_size
+        size = st.st_size
         if size > 500_000:
             return f"Error: file is too large ({_format_size(size)}). Max 500KB."
 
@@ -133,26 +187,27 @@ class FileSystemTool(Tool):
 
     @staticmethod
     def _file_info(path: Path) -> str:
-        if not path.exists():
+        st = _stat(path)
+        if st is None:
             return f"Error: '{path}' does not exist"
 
-        stat = path.stat()
         info_lines = [
             f"Path: {path}",
-            f"Type: {'directory' if path.is_dir() else 'file'}",
-            f"Size: {_format_size(stat.st_size)}",
-            f"Modified: {stat.st_mtime}",
-            f"Permissions: {oct(stat.st_mode)}",
+            f"Type: {'directory' if stat.S_ISDIR(st.st_mode) else 'file'}",
+            f"Size: {_format_size(st.st_size)}",
+            f"Modified: {st.st_mtime}",
+            f"Permissions: {oct(st.st_mode)}",
         ]
         return "\n".join(info_lines)
 
     def _send_file(self, path: Path) -> str:
         """Read a file and queue it as an attachment to be sent to the user."""
-        if not path.is_file():
+        st = _stat(path)
+        if st is None or not stat.S_ISREG(st.st_mode):
             return f"Error: '{path}' is not a file"
 
         MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
-        size = path.stat().st_size
+        size = st.st_size
         if size > MAX_FILE_SIZE:
             return f"Error: file is too large ({_format_size(size)}). Max 50MB."
 
@@ -235,17 +290,35 @@ class FileSystemTool(Tool):
         if not path.is_dir():
             return f"Error: '{path}' is not a directory"
 
+        if not pattern or "/" in pattern or os.sep in pattern:
+            # Multi-part patterns match against trailing path components
+            def matches(entry: os.DirEntry) -> bool:
+                return Path(entry.path).match(pattern)
+        else:
+            # Plain name patterns: compile once, match the entry name only
+            name_re = re.compile(fnmatch.translate(os.path.normcase(pattern)))
+
+            def matches(entry: os.DirEntry) -> bool:
+                return name_re.match(os.path.normcase(entry.name)) is not None
+
+        # Breadth-first over os.scandir, whose entries answer is_dir() from the
+        # directory listing instead of a stat per entry. Like os.walk, symlinked
+        # directories aren't descended into and unreadable ones are skipped.
         results = []
-        for root, dirs, files in os.walk(path):
-            depth = Path(root).relative_to(path).parts
-            if len(depth) >= max_depth:
-                dirs.clear()
+        queue = deque([(str(path), 0)]) if max_depth > 0 else deque()
+        while queue:
+            dir_path, depth = queue.popleft()
+            try:
+                with os.scandir(dir_path) as it:
+                    entries = list(it)
+            except OSError:
                 continue
-
-            root_path = Path(root)
-            for f in files:
-                if root_path.joinpath(f).match(pattern):
-                    results.append(str(root_path / f))
+            for entry in entries:
+                if entry.is_dir():
+                    if depth + 1 < max_depth and not entry.is_symlink():
+                        queue.append((entry.path, depth + 1))
+                elif matches(entry):
+                    results.append(entry.path)
                     if len(results) >= 50:
                         results.append("... (truncated at 50 results)")
                         return "\n".join(results)
@@ -28,8 +28,15 @@ class ToolRegistry:
         return self._tools.get(name)
 
     def get_tools_by_names(self, names: list[str]) -> list[Tool]:
-        """Get a subset of tools by name list."""
-        return [self._tools[n] for n in names if n in self._tools]
+        """Get a subset of tools by name list, skipping (and logging) unknown names."""
+        tools: list[Tool] = []
+        for n in names:
+            tool = self._tools.get(n)
+            if tool is None:
+                logger.warning("tool_unknown", name=n)
+            else:
+                tools.append(tool)
+        return tools
 
     def all_tools(self) -> list[Tool]:
         return list(self._tools.values())
@@ -4,7 +4,7 @@ from __future__ import annotations
 
 import json
 from datetime import datetime
-from typing import Any
+from typing import Any, ClassVar
 
 from panda_bot.ai.tools.base import Tool
 from panda_bot.log import get_logger
@@ -16,6 +16,45 @@ logger = get_logger(__name__)
 class SchedulerTool(Tool):
     """Tool for scheduling recurring or one-shot tasks with AI execution."""
 
+    requires_serial = True
+
+    _INPUT_SCHEMA: ClassVar[dict[str, Any]] = {
+        "type": "object",
+        "properties": {
+            "action": {
+                "type": "string",
+                "enum": ["add_cron", "add_once", "list", "remove"],
+                "description": (
+                    "'add_cron' = add recurring cron job, "
+                    "'add_once' = add one-time job, "
+                    "'list' = list all jobs, "
+                    "'remove' = remove a job by ID"
+                ),
+            },
+            "cron_expr": {
+                "type": "string",
+                "description": "Cron expression (minute hour day month weekday) for add_cron",
+            },
+            "run_at": {
+                "type": "string",
+                "description": "ISO datetime string for add_once (e.g. '2025-01-15T14:30:00')",
+            },
+            "task_prompt": {
+                "type": "string",
+                "description": (
+                    "The AI prompt to execute when the job runs. "
+                    "The result will be sent to the current chat. "
+                    "Example: 'Check nate.com mail for new emails and summarize them.'"
+                ),
+            },
+            "job_id": {
+                "type": "string",
+                "description": "Job ID for remove action",
+            },
+        },
+        "required": ["action"],
+    }
+
     def __init__(self, scheduler_service: SchedulerService):
         super().__init__()
         self._scheduler = scheduler_service
@@ -42,42 +81,7 @@ class SchedulerTool(Tool):
 
     @property
     def input_schema(self) -> dict[str, Any]:
-        return {
-            "type": "object",
-            "properties": {
-                "action": {
-                    "type": "string",
-                    "enum": ["add_cron", "add_once", "list", "remove"],
-                    "description": (
-                        "'add_cron' = add recurring cron job, "
-                        "'add_once' = add one-time job, "
-                        "'list' = list all jobs, "
-                        "'remove' = remove a job by ID"
-                    ),
-                },
-                "cron_expr": {
-                    "type": "string",
-                    "description": "Cron expression (minute hour day month weekday) for add_cron",
-                },
-                "run_at": {
-                    "type": "string",
-                    "description": "ISO datetime string for add_once (e.g. '2025-01-15T14:30:00')",
-                },
-                "task_prompt": {
-                    "type": "string",
-                    "description": (
-                        "The AI prompt to execute when the job runs. "
-                        "The result will be sent to the current chat. "
-                        "Example: 'Check nate.com mail for new emails and summarize them.'"
-                    ),
-                },
-                "job_id": {
-                    "type": "string",
-                    "description": "Job ID for remove action",
-                },
-            },
-            "required": ["action"],
-        }
+        return self._INPUT_SCHEMA
 
     async def execute(self, **kwargs: Any) -> str:
         action = kwargs.get("action", "list")
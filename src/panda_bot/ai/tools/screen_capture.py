@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 import io
-from typing import Any
+from typing import Any, ClassVar
 
 import mss
 
@@ -13,6 +13,22 @@ from panda_bot.ai.tools.base import Tool
 class ScreenCaptureTool(Tool):
     """Capture the PC desktop screen."""
 
+    _INPUT_SCHEMA: ClassVar[dict[str, Any]] = {
+        "type": "object",
+        "properties": {
+            "monitor": {
+                "type": "integer",
+                "description": (
+                    "Monitor number to capture. "
+                    "0 = all monitors combined, "
+                    "1 = primary monitor, "
+                    "2 = second monitor, etc."
+                ),
+            },
+        },
+        "required": [],
+    }
+
     @property
     def name(self) -> str:
         return "screen_capture"
@@ -27,21 +43,7 @@ class ScreenCaptureTool(Tool):
 
     @property
     def input_schema(self) -> dict[str, Any]:
-        return {
-            "type": "object",
-            "properties": {
-                "monitor": {
-                    "type": "integer",
-                    "description": (
-                        "Monitor number to capture. "
-                        "0 = all monitors combined, "
-                        "1 = primary monitor, "
-                        "2 = second monitor, etc."
-                    ),
-                },
-            },
-            "required": [],
-        }
+        return self._INPUT_SCHEMA
 
     async def execute(self, **kwargs: Any) -> str:
         monitor = kwargs.get("monitor", 1)
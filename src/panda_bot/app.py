@@ -111,6 +111,7 @@ class PandaBotApp:
                 logger.error("bot_stop_error", error=str(e))
 
         await self.service_manager.stop_all()
+        await self.conversation_repo.flush()
         await self.db.close()
         logger.info("panda_bot_stopped")
 
@@ -5,7 +5,7 @@ from __future__ import annotations
 import os
 import re
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional
 
 import yaml
 from dotenv import load_dotenv
@@ -19,6 +19,7 @@ class AIConfig(BaseModel):
     system_prompt: str = ""
     temperature: float = 0.7
     tools: list[str] = Field(default_factory=list)
+    response_cache_ttl: int = 0  # Seconds to reuse replies to identical requests; 0 = off, tool-less bots only
 
 
 class BotConfig(BaseModel):
@@ -26,6 +27,7 @@ class BotConfig(BaseModel):
     platform: str
     token: str
     guild_ids: list[int] = Field(default_factory=list)
+    max_concurrent_requests: int = 16  # AI runs in flight at once; extra messages queue
     ai: AIConfig = Field(default_factory=AIConfig)
 
 
@@ -34,6 +36,7 @@ class AnthropicConfig(BaseModel):
     base_url: Optional[str] = None
     max_retries: int = 3
     timeout: int = 120
+    prompt_cache: bool = True  # Mark system prompt and conversation prefix for prompt caching
 
 
 class ClaudeCodeConfig(BaseModel):
@@ -54,6 +57,7 @@ class BrowserServiceConfig(BaseModel):
 class SchedulerServiceConfig(BaseModel):
     timezone: str = "Asia/Seoul"
     max_concurrent_jobs: int = 5
+    cron_jitter: int = 0  # Max random delay (seconds) per cron run, to spread jobs on the same tick
 
 
 class ServicesConfig(BaseModel):
@@ -94,6 +98,17 @@ def _interpolate_env_vars(text: str, extra: dict[str, str] | None = None) -> str
     return _ENV_VAR_PATTERN.sub(_replace, text)
 
 
+def _interpolate_tree(node: Any, extra: dict[str, str]) -> Any:
+    """Apply _interpolate_env_vars to every string value in parsed YAML data."""
+    if isinstance(node, str):
+        return _interpolate_env_vars(node, extra) if "${" in node else node
+    if isinstance(node, dict):
+        return {key: _interpolate_tree(value, extra) for key, value in node.items()}
+    if isinstance(node, list):
+        return [_interpolate_tree(item, extra) for item in node]
+    return node
+
+
 def load_config(config_path: str | Path = "config.yaml", env_path: str | Path = ".env") -> AppConfig:
     """Load and validate configuration from YAML file with env-var interpolation."""
     env_file = Path(env_path)
@@ -104,15 +119,14 @@ def load_config(config_path: str | Path = "config.yaml", env_path: str | Path =
     if not config_file.exists():
         raise FileNotFoundError(f"Configuration file not found: {config_file}")
 
-    raw_text = config_file.read_text(encoding="utf-8")
+    raw_data = yaml.safe_load(config_file.read_text(encoding="utf-8"))
 
-    # First pass: extract data_dir for self-referencing
-    raw_data = yaml.safe_load(raw_text)
+    # Resolve data_dir first so other values can reference it
     data_dir = raw_data.get("data_dir", "./data")
     data_dir = _interpolate_env_vars(data_dir)
 
-    # Second pass: interpolate all env vars
-    interpolated = _interpolate_env_vars(raw_text, extra={"data_dir": data_dir})
-    data = yaml.safe_load(interpolated)
+    # Interpolate env vars in the parsed values; substituted text is never
+    # re-parsed as YAML
+    data = _interpolate_tree(raw_data, extra={"data_dir": data_dir})
 
     return AppConfig(**data)
@@ -16,6 +16,8 @@ class Attachment:
     data: bytes
     media_type: str  # e.g. "image/jpeg", "image/png"
     filename: str = "attachment"
+    # Base64 of data, filled lazily by build_messages (excluded from eq/hash)
+    _b64_cache: Optional[str] = field(default=None, init=False, repr=False, compare=False)
 
 
 @dataclass(frozen=True, slots=True)
@@ -175,6 +175,8 @@ class SchedulerService(Service):
             day=parts[2] if len(parts) > 2 else "*",
             month=parts[3] if len(parts) > 3 else "*",
             day_of_week=parts[4] if len(parts) > 4 else "*",
+            # Spreads jobs sharing a tick (e.g. "0 * * * *") over a window
+            jitter=self._config.cron_jitter or None,
         )
         self._scheduler.add_job(callback, trigger, id=job_id, kwargs=kwargs)
         logger.info("cron_job_added", job_id=job_id, cron=cron_expr)
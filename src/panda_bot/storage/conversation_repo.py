@@ -2,7 +2,9 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
+from collections import OrderedDict
 from datetime import datetime
 from typing import Optional
 
@@ -12,54 +14,174 @@ from panda_bot.storage.models import ConversationRecord, SessionInfo
 
 logger = get_logger(__name__)
 
+_INSERT_TURN_SQL = """INSERT INTO conversation_turns
+   (bot_id, session_id, chat_id, role, content, model,
+    token_input, token_output, tool_name, tool_call_id)
+   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+
+
+# Sessions whose full history is kept in memory, and the longest history kept
+_HISTORY_CACHE_SESSIONS = 128
+_HISTORY_CACHE_MAX_TURNS = 1000
+
+
+def _turn_params(record: ConversationRecord) -> tuple:
+    return (
+        record.bot_id,
+        record.session_id,
+        record.chat_id,
+        record.role,
+        record.content,
+        record.model,
+        record.token_input,
+        record.token_output,
+        record.tool_name,
+        record.tool_call_id,
+    )
+
 
 class ConversationRepository:
     """CRUD + FTS5 search over conversation history."""
 
     def __init__(self, db: Database):
         self._db = db
+        # Complete, write-through history of recently used sessions, so a
+        # session's turns are read from the database once rather than per message
+        self._history_cache: OrderedDict[tuple[str, str], list[ConversationRecord]] = (
+            OrderedDict()
+        )
+        # Sessions with a cold history read in flight, mapped to whether a turn
+        # was written to them meanwhile (the read's result may then be stale)
+        self._loading: dict[tuple[str, str], bool] = {}
+        # Turns queued by save_turn_nowait, written by a background flush
+        self._pending: list[ConversationRecord] = []
+        self._flush_task: asyncio.Task | None = None
+
+    def _cache_append(self, records: list[ConversationRecord]) -> None:
+        # Called in the same step the insert is queued on the connection, which
+        # runs statements in order: a concurrent history read either sees the
+        # turn in its SELECT or is marked stale here, never both
+        for record in records:
+            key = (record.bot_id, record.session_id)
+            if key in self._loading:
+                self._loading[key] = True
+            history = self._history_cache.get(key)
+            if history is None:
+                continue
+            if len(history) >= _HISTORY_CACHE_MAX_TURNS:
+                del self._history_cache[key]
+            else:
+                history.append(record)
+
+    def _cache_evict(self, records: list[ConversationRecord]) -> None:
+        """Drop cached sessions whose turns failed to save."""
+        for record in records:
+            self._history_cache.pop((record.bot_id, record.session_id), None)
 
     async def save_turn(self, record: ConversationRecord) -> int:
         """Save a conversation turn and return its ID."""
-        cursor = await self._db.conn.execute(
-            """INSERT INTO conversation_turns
-               (bot_id, session_id, chat_id, role, content, model,
-                token_input, token_output, tool_name, tool_call_id)
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-            (
-                record.bot_id,
-                record.session_id,
-                record.chat_id,
-                record.role,
-                record.content,
-                record.model,
-                record.token_input,
-                record.token_output,
-                record.tool_name,
-                record.tool_call_id,
-            ),
+        await self.flush()
+        self._cache_append([record])
+        try:
+            cursor = await self._db.conn.execute(_INSERT_TURN_SQL, _turn_params(record))
+            await self._db.conn.commit()
+        except Exception:
+            self._cache_evict([record])
+            raise
+        return cursor.lastrowid  # type: ignore[return-value]
+
+    async def save_turns(self, records: list[ConversationRecord]) -> None:
+        """Save several conversation turns, in order, with a single commit."""
+        if not records:
+            return
+        await self.flush()
+        self._cache_append(records)
+        try:
+            await self._insert_turns(records)
+        except Exception:
+            self._cache_evict(records)
+            raise
+
+    def save_turn_nowait(self, record: ConversationRecord) -> None:
+        """Queue a conversation turn to be saved in the background.
+
+        For turns nothing waits on (e.g. a final reply). Queued turns are
+        written before any later save or read, and by flush().
+        """
+        self._pending.append(record)
+        self._cache_append([record])
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._background_flush())
+
+    async def flush(self) -> None:
+        """Write all turns queued by save_turn_nowait.
+
+        Also waits for a background flush already writing turns it took off
+        the queue, so the database can be closed once this returns.
+        """
+        task = self._flush_task
+        if task is not None and not task.done() and task is not asyncio.current_task():
+            await asyncio.shield(task)
+        while self._pending:
+            records, self._pending = self._pending, []
+            try:
+                await self._insert_turns(records)
+            except Exception:
+                self._cache_evict(records)
+                raise
+
+    async def _background_flush(self) -> None:
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error("turn_flush_error", error=str(e))
+
+    async def _insert_turns(self, records: list[ConversationRecord]) -> None:
+        await self._db.conn.executemany(
+            _INSERT_TURN_SQL, [_turn_params(record) for record in records]
         )
         await self._db.conn.commit()
-        return cursor.lastrowid  # type: ignore[return-value]
 
     async def get_session_history(
         self, bot_id: str, session_id: str, limit: int = 100
     ) -> list[ConversationRecord]:
         """Get conversation history for a session, ordered by time."""
-        cursor = await self._db.conn.execute(
-            """SELECT * FROM conversation_turns
-               WHERE bot_id = ? AND session_id = ?
-               ORDER BY created_at ASC
-               LIMIT ?""",
-            (bot_id, session_id, limit),
-        )
-        rows = await cursor.fetchall()
-        return [self._row_to_record(row) for row in rows]
+        key = (bot_id, session_id)
+        history = self._history_cache.get(key)
+        if history is not None:
+            self._history_cache.move_to_end(key)
+            return history[:limit]
+
+        # Only the first of concurrent reads of a session may fill its cache entry
+        owner = key not in self._loading
+        if owner:
+            self._loading[key] = False
+        try:
+            await self.flush()
+            cursor = await self._db.conn.execute(
+                """SELECT * FROM conversation_turns
+                   WHERE bot_id = ? AND session_id = ?
+                   ORDER BY created_at ASC
+                   LIMIT ?""",
+                (bot_id, session_id, limit),
+            )
+            rows = await cursor.fetchall()
+        finally:
+            stale = self._loading.pop(key) if owner else True
+        records = [self._row_to_record(row) for row in rows]
+        if len(records) < limit and not stale:
+            # Got every turn of the session, so later calls can be served from
+            # memory whatever their limit
+            self._history_cache[key] = records[:]
+            if len(self._history_cache) > _HISTORY_CACHE_SESSIONS:
+                self._history_cache.popitem(last=False)
+        return records
 
     async def search(
         self, query: str, bot_id: Optional[str] = None, limit: int = 20
     ) -> list[ConversationRecord]:
         """Full-text search across conversation history."""
+        await self.flush()
         if bot_id:
             cursor = await self._db.conn.execute(
                 """SELECT t.* FROM conversation_turns t
@@ -83,6 +205,11 @@ class ConversationRepository:
 
     async def delete_session(self, bot_id: str, session_id: str) -> int:
         """Delete all turns for a session. Returns number of deleted rows."""
+        await self.flush()
+        key = (bot_id, session_id)
+        self._history_cache.pop(key, None)
+        if key in self._loading:
+            self._loading[key] = True
         cursor = await self._db.conn.execute(
             "DELETE FROM conversation_turns WHERE bot_id = ? AND session_id = ?",
             (bot_id, session_id),
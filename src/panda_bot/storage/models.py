@@ -7,7 +7,7 @@ from datetime import datetime
 from typing import Optional
 
 
-@dataclass
+@dataclass(slots=True)
 class ConversationRecord:
     bot_id: str
     session_id: str
@@ -21,6 +21,8 @@ class ConversationRecord:
     tool_call_id: Optional[str] = None
     timestamp: datetime = field(default_factory=datetime.utcnow)
     id: Optional[int] = None
+    # Parsed tool_use input, filled lazily by build_messages (excluded from eq/repr)
+    _tool_input: Optional[dict] = field(default=None, init=False, repr=False, compare=False)
 
 
 @dataclass